@@ -0,0 +1,92 @@
+"""Benchmark: full response.json() + dict access vs parse_catalog.
+
+Run from the repo root: python bench/bench_decode.py [payload.json ...]
+Without arguments a synthetic payload shaped like /api/v2/catalog/items
+(photos, user objects, ...) is used.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from records import parse_catalog, _loads
+
+ROUNDS = 200
+
+
+def synthetic_payload(n=96):
+    items = []
+    for i in range(n):
+        items.append({
+            "id": 5_000_000_000 + i,
+            "title": f"Item {i} vintage jacket",
+            "price": {"amount": f"{10 + i % 30}.0", "currency_code": "EUR"},
+            "is_visible": True,
+            "discount": None,
+            "brand_title": "Brand",
+            "path": f"/items/{5_000_000_000 + i}-item",
+            "user": {
+                "id": 1000 + i, "login": f"seller{i}", "business": False,
+                "profile_url": f"https://www.vinted.nl/member/{1000 + i}",
+                "photo": {"id": i, "url": "https://images.vinted.net/x.jpg", "thumbnails": [
+                    {"type": t, "url": f"https://images.vinted.net/{t}.jpg", "width": 100, "height": 100}
+                    for t in ("thumb20", "thumb50", "thumb100", "thumb150")]},
+            },
+            "url": f"https://www.vinted.nl/items/{5_000_000_000 + i}-item",
+            "promoted": False,
+            "photo": {
+                "id": 10_000 + i, "width": 600, "height": 800, "dominant_color": "#AAAAAA",
+                "url": "https://images.vinted.net/photo.jpg", "is_main": True,
+                "thumbnails": [{"type": t, "url": f"https://images.vinted.net/{t}.jpg", "width": 300, "height": 400}
+                               for t in ("thumb70x100", "thumb150x210", "thumb310x430", "thumb428x624", "thumb364x428")],
+                "high_resolution": {"id": "x", "timestamp": 1700000000, "orientation": None},
+            },
+            "favourite_count": i % 7,
+            "is_favourite": False,
+            "view_count": 0,
+            "service_fee": {"amount": "0.70", "currency_code": "EUR"},
+            "total_item_price": {"amount": f"{10.7 + i % 30}", "currency_code": "EUR"},
+            "size_title": "M",
+            "content_source": "search",
+            "search_tracking_params": {"score": 0.5, "matched_queries": []},
+        })
+    return json.dumps({"items": items, "pagination": {"current_page": 1, "total_pages": 10}}).encode()
+
+
+def dict_path(content):
+    data = json.loads(content)
+    out = []
+    for item in data.get("items", []):
+        price = item.get("price")
+        out.append((item.get("id"), item.get("title"), item.get("url"),
+                    price["amount"], price["currency_code"], item.get("brand_title"), item.get("size_title")))
+    return out
+
+
+def measure(fn, payloads):
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        for content in payloads:
+            fn(content)
+    cpu = (time.process_time() - start) / (ROUNDS * len(payloads))
+
+    tracemalloc.start()
+    kept = [fn(content) for content in payloads]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak, kept
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        payloads = [open(path, "rb").read() for path in sys.argv[1:]]
+    else:
+        payloads = [synthetic_payload()]
+    print(f"{len(payloads)} payload(s), {sum(map(len, payloads)) / len(payloads) / 1024:.0f} KiB avg, "
+          f"parser: {_loads.__module__ or 'json'}")
+    for name, fn in (("response.json() path", dict_path), ("parse_catalog", parse_catalog)):
+        cpu, peak, _ = measure(fn, payloads)
+        print(f"{name:>22}: {cpu * 1e6:8.0f} us/payload CPU, peak {peak / 1024:8.0f} KiB")
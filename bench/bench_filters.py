@@ -0,0 +1,107 @@
+"""Benchmark: per-item cost of the compiled client-side filters.
+
+Compiles a filter set with hundreds of keywords, regexes, seller exclusions
+and size price caps, then times ItemFilter over synthetic item batches,
+next to a naive loop checking every keyword in turn.
+
+Run from the repo root: python bench/bench_filters.py [--keywords 400]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from filters import ItemFilter
+from records import ItemRecord
+
+WORDS = ("vintage", "jacket", "denim", "wool", "leather", "shirt", "dress", "cotton", "linen", "boots",
+         "sneakers", "coat", "knit", "sweater", "jeans", "skirt", "blazer", "cardigan", "hoodie", "parka")
+SIZES = ("XS", "S", "M", "L", "XL", "XXL", "36", "38", "40", "42")
+
+
+def random_word(rng):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+
+
+def build_spec(rng, keywords):
+    vocabulary = [random_word(rng) for _ in range(keywords)]
+    return {
+        "include": vocabulary[:keywords // 2] + list(WORDS[:10]),
+        "exclude": vocabulary[keywords // 2:],
+        "include_regex": [rf"\b{w}s?\b" for w in WORDS[10:]],
+        "exclude_regex": [rf"\b{random_word(rng)}\d+\b" for _ in range(50)],
+        "exclude_sellers": [f"seller{i}" for i in range(0, 2000, 20)],
+        "max_price_by_size": {size: 10 + 3 * i for i, size in enumerate(SIZES)},
+    }
+
+
+def build_items(rng, n, vocabulary):
+    items = []
+    for i in range(n):
+        words = [rng.choice(WORDS) for _ in range(3)] + [rng.choice(vocabulary) for _ in range(rng.randint(0, 2))]
+        rng.shuffle(words)
+        items.append(ItemRecord(5_000_000_000 + i, " ".join(words).title(), None,
+                                f"{rng.uniform(3, 60):.1f}", "EUR", "Brand", rng.choice(SIZES),
+                                f"seller{rng.randrange(2000)}"))
+    return items
+
+
+def naive_filter(spec):
+    include = [w.lower() for w in spec["include"]]
+    exclude = [w.lower() for w in spec["exclude"]]
+    include_re = [re.compile(r, re.IGNORECASE) for r in spec["include_regex"]]
+    exclude_re = [re.compile(r, re.IGNORECASE) for r in spec["exclude_regex"]]
+    sellers = set(spec["exclude_sellers"])
+    sizes = {k.lower(): v for k, v in spec["max_price_by_size"].items()}
+
+    def check(item):
+        words = item.title.lower().split()
+        if not (any(w in words for w in include) or any(r.search(item.title) for r in include_re)):
+            return False
+        if any(w in words for w in exclude) or any(r.search(item.title) for r in exclude_re):
+            return False
+        if item.seller in sellers:
+            return False
+        cap = sizes.get(item.size.lower())
+        return cap is None or float(item.price) <= cap
+    return check
+
+
+def per_item(check, items, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in items:
+            check(item)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keywords", type=int, default=400)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    spec = build_spec(rng, args.keywords)
+    start = time.perf_counter()
+    compiled = ItemFilter(spec)
+    compile_time = time.perf_counter() - start
+    items = build_items(rng, args.items, spec["include"] + spec["exclude"])
+    rules = sum(len(v) for v in spec.values())
+
+    naive = naive_filter(spec)
+    passed = sum(map(compiled, items))
+    print(f"{rules} rules, compiled in {compile_time * 1000:.1f} ms, {passed}/{len(items)} items pass")
+    print(f"compiled: {per_item(compiled, items, args.rounds) * 1e6:6.2f} us/item")
+    print(f"naive:    {per_item(naive, items, args.rounds) * 1e6:6.2f} us/item")
+
+
+if __name__ == "__main__":
+    main()
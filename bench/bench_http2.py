@@ -0,0 +1,176 @@
+"""Per-request latency of HTTP/1.1 vs HTTP/2 clients against local stand-ins.
+
+Two local servers answer API-sized JSON pages after --latency seconds. Every
+new connection first costs --setup seconds, standing in for the proxy tunnel
+and TLS handshake of a real connection. The HTTP/2 server speaks h2 with prior
+knowledge over plain TCP and serves streams concurrently.
+
+Measured with the repo's client factories:
+- a new client per request: the cost when every refresh rebuilt the client
+- one reused client: keep-alive, what refresh_clients keeps when the proxy is unchanged
+- a burst of concurrent requests on one async client: HTTP/1.1 opens a
+  connection per request in flight, HTTP/2 multiplexes them over one
+
+Run from the repo root: python bench/bench_http2.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import h2.config
+import h2.connection
+import h2.events
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils import create_api_client, create_async_api_client
+
+BODY = json.dumps({"items": [{"id": i, "title": f"Mock item {i}", "price": {"amount": "12.5"}} for i in range(96)]}).encode()
+
+
+class Stats:
+    def __init__(self):
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def connected(self):
+        with self.lock:
+            self.connections += 1
+
+
+def serve_http1(setup, latency, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = 1 << 16  # headers and body in one write
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            stats.connected()
+            time.sleep(setup)
+            super().setup()
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def h2_connection(sock, setup, latency, stats):
+    stats.connected()
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    time.sleep(setup)
+    conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+    conn.initiate_connection()
+    lock = threading.Lock()
+    sock.sendall(conn.data_to_send())
+
+    def respond(stream_id):
+        time.sleep(latency)
+        with lock:
+            conn.send_headers(stream_id, [(":status", "200"), ("content-type", "application/json"),
+                                          ("content-length", str(len(BODY)))])
+            # stay within the peer's flow-control window and frame size
+            view = memoryview(BODY)
+            while view:
+                size = min(len(view), conn.max_outbound_frame_size, conn.local_flow_control_window(stream_id))
+                conn.send_data(stream_id, view[:size].tobytes(), end_stream=size == len(view))
+                view = view[size:]
+            sock.sendall(conn.data_to_send())
+
+    with sock:
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            with lock:
+                events = conn.receive_data(data)
+                sock.sendall(conn.data_to_send())
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    threading.Thread(target=respond, args=(event.stream_id,), daemon=True).start()
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+
+
+def serve_http2(setup, latency, stats):
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def accept():
+        while True:
+            sock, _ = listener.accept()
+            threading.Thread(target=h2_connection, args=(sock, setup, latency, stats), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return f"http://127.0.0.1:{listener.getsockname()[1]}"
+
+
+def timed(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+async def burst(url, http2, size, rounds):
+    options = {"http2": http2, "prior_knowledge": http2}
+    async with create_async_api_client("bench", None, "cookie", **options) as client:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            responses = await asyncio.gather(*(client.get(url) for _ in range(size)))
+            assert all(response.status_code == 200 for response in responses)
+        return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--setup", type=float, default=0.15, help="seconds to open a connection")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds to answer a request")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--burst", type=int, default=8, help="concurrent requests per burst")
+    parser.add_argument("--rounds", type=int, default=5, help="bursts on one client")
+    args = parser.parse_args()
+
+    for label, http2, serve in (("HTTP/1.1", False, serve_http1), ("HTTP/2  ", True, serve_http2)):
+        stats = Stats()
+        url = serve(args.setup, args.latency, stats)
+        options = {"http2": http2, "prior_knowledge": http2}
+
+        def cold():
+            with create_api_client("bench", None, "cookie", **options) as client:
+                client.get(url).raise_for_status()
+
+        with create_api_client("bench", None, "cookie", **options) as client:
+            client.get(url)  # open the connection
+            warm = timed(lambda: client.get(url).raise_for_status(), args.requests)
+            version = client.get(url).http_version
+        cold_time = timed(cold, args.requests)
+
+        before = stats.connections
+        burst_time = asyncio.run(burst(url, http2, args.burst, args.rounds))
+        print(f"{label} ({version}): new client {cold_time * 1000:6.1f} ms, reused {warm * 1000:6.1f} ms per request; "
+              f"{args.rounds} bursts of {args.burst}: {burst_time * 1000:6.1f} ms each, "
+              f"{stats.connections - before} connections opened")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Cost of one response log line on the polling thread.
+
+Compares the old synchronous FileHandler with an eager f-string against the
+queued JSON-lines logger with lazy %-formatting, both writing to a scratch
+directory. Only the time spent in the caller is measured. The queued logger
+is timed twice: with its writer thread running (a tight loop shares the GIL
+with it) and with the writer started after the loop, which is the caller's
+own cost when lines arrive at polling pace.
+
+Run from the repo root: python bench/bench_logging.py
+"""
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from logging.handlers import QueueListener
+
+from jsonlog import start_logging, stop_logging, LazyQueueHandler, RotatingJsonlHandler, JsonFormatter
+
+PROXY = "http://10.0.0.1:8080"
+URL = "http://www.vinted.nl/api/v2/catalog/items?search_text=&catalog_ids=1234&order=newest_first&per_page=96"
+
+
+def sync_logger(directory):
+    logger = logging.getLogger("bench.sync")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.FileHandler(os.path.join(directory, "sync.log"))
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def log_response(logger, i):
+    latency = 0.05 + (i % 7) / 10
+    logger.info('"%s %s %s" | %.2fs | %s %s', "HTTP/1.1", 200, "OK", latency, "GET", URL,
+                extra={"proxy": PROXY, "status": 200, "latency": latency, "method": "GET", "url": URL})
+
+
+def main():
+    n = 50_000
+    directory = tempfile.mkdtemp(prefix="vimo-logs-")
+
+    logger, handler = sync_logger(directory)
+    start = time.perf_counter()
+    for i in range(n):
+        latency = 0.05 + (i % 7) / 10
+        logger.info(f'"HTTP/1.1 200 OK" | {latency:.2f}s | GET {URL}')
+    elapsed = time.perf_counter() - start
+    handler.close()
+    print(f"FileHandler, f-string:  {elapsed / n * 1e6:6.2f} µs per line in the caller")
+
+    logger = logging.getLogger("bench.queued")
+    listener = start_logging(logger, "queued", directory)
+    start = time.perf_counter()
+    for i in range(n):
+        log_response(logger, i)
+    elapsed = time.perf_counter() - start
+    stop_logging(logger, listener)
+    print(f"queued, writer running: {elapsed / n * 1e6:6.2f} µs per line in the caller")
+
+    logger = logging.getLogger("bench.deferred")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    records = queue.SimpleQueue()
+    logger.addHandler(LazyQueueHandler(records))
+    start = time.perf_counter()
+    for i in range(n):
+        log_response(logger, i)
+    elapsed = time.perf_counter() - start
+    handler = RotatingJsonlHandler(os.path.join(directory, "deferred.jsonl"))
+    handler.setFormatter(JsonFormatter())
+    listener = QueueListener(records, handler)
+    start = time.perf_counter()
+    listener.start()
+    listener.stop()
+    handler.close()
+    print(f"queued, writer idle:    {elapsed / n * 1e6:6.2f} µs per line in the caller, "
+          f"{(time.perf_counter() - start) / n * 1e6:6.2f} µs on the writer")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Per-call cost of the metrics pipeline on the response hot path.
+
+Times Counter.inc, Histogram.observe, MonitorMetrics.observe_response and a
+full /metrics render with realistic label cardinality.
+
+Run from the repo root: python bench/bench_metrics.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from metrics import MonitorMetrics
+
+
+def per_call(stmt, number, **names):
+    return min(timeit.repeat(stmt, globals=names, number=number, repeat=5)) / number
+
+
+def main():
+    m = MonitorMetrics()
+    proxies = [f"http://10.0.0.{i}:8080" for i in range(50)]
+    for i in range(10_000):
+        m.observe_response("api", proxies[i % 50], 200 if i % 20 else 429, 0.05 + (i % 7) / 10, 12_000)
+        m.observe_poll(i % 12, 1, i % 3, 0.3)
+
+    n = 200_000
+    print(f"Counter.inc:        {per_call('c.inc(labels)', n, c=m.requests, labels=('api', 200)) * 1e9:7.0f} ns")
+    print(f"Histogram.observe:  {per_call('h.observe(0.3, labels)', n, h=m.request_seconds, labels=('api',)) * 1e9:7.0f} ns")
+    stmt = "m.observe_response('api', p, 200, 0.3, 12000)"
+    print(f"observe_response:   {per_call(stmt, n, m=m, p=proxies[0]) * 1e9:7.0f} ns")
+    print(f"observe_poll:       {per_call('m.observe_poll(3, 1, 0, 0.3)', n, m=m) * 1e9:7.0f} ns")
+    body = m.registry.render()
+    print(f"render:             {per_call('m.registry.render()', 200, m=m) * 1e3:7.2f} ms "
+          f"({len(body.splitlines())} lines, {len(body) / 1024:.0f} KiB)")
+    print(f"summary: {m.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Micro-benchmark: SeenStore lookup cost as the store grows.
+
+Run from the repo root: python bench/bench_seen.py [max_size]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from seen import SeenStore
+
+LOOKUPS = 200_000
+
+
+def time_lookups(store, probes):
+    start = time.perf_counter()
+    for item_id in probes:
+        item_id in store
+    return (time.perf_counter() - start) / len(probes) * 1e9
+
+
+if __name__ == "__main__":
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 4_000_000
+    store = SeenStore(capacity=max_size, max_age=None)
+    next_id = 5_000_000_000
+    size = 1_000
+    print(f"{'size':>10} | {'hit ns/op':>10} | {'miss ns/op':>10}")
+    while size <= max_size:
+        while len(store) < size:
+            store.add(next_id, now=0.0)
+            next_id += random.randint(1, 5)
+        hits = [random.choice((next_id - 1, next_id - 2)) for _ in range(LOOKUPS)]
+        misses = [next_id + i for i in range(LOOKUPS)]
+        print(f"{size:>10} | {time_lookups(store, hits):>10.1f} | {time_lookups(store, misses):>10.1f}")
+        size *= 4
+
+    # steady state: store full, every add evicts the oldest entry
+    while len(store) < store.capacity:
+        store.add(next_id, now=0.0)
+        next_id += 1
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        store.add(next_id, now=0.0)
+        next_id += 1
+    elapsed = time.perf_counter() - start
+    assert len(store) == store.capacity
+    print(f"full-store add+evict: {elapsed / LOOKUPS * 1e9:.1f} ns/op, size {len(store)}")
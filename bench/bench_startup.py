@@ -0,0 +1,102 @@
+"""Benchmark: process startup up to a constructed monitor.
+
+Each case runs in a fresh interpreter (median of --runs) in a scratch
+directory holding the repo's search_params.yaml:
+
+- import utils: which heavy optional modules get pulled in at import
+- cached catalog: import main + create_monitor() from proxy_catalog.json
+- txt list: the same with a proxy .txt file
+- scrape: the cost the catalog avoids on restarts (bs4 import and parsing
+  a free-proxy-list page of --proxies rows; served locally, no network)
+
+Run from the repo root: python bench/bench_startup.py
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SRC = os.path.join(ROOT, "src")
+
+IMPORT_UTILS = """
+import sys, time
+start = time.perf_counter()
+import utils
+elapsed = time.perf_counter() - start
+print(elapsed, "bs4" in sys.modules, "yaml" in sys.modules)
+"""
+
+CREATE_MONITOR = """
+import sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+monitor = main.create_monitor({path!r})
+print(imported - start, time.perf_counter() - imported, "bs4" in sys.modules)
+"""
+
+SCRAPE = """
+import time
+import utils
+html = open("page.html").read()
+utils.httpx.get = lambda url: type("Response", (), {"text": html})
+start = time.perf_counter()
+proxies = utils.scrape_proxies()
+print(time.perf_counter() - start, len(proxies))
+"""
+
+
+def run(code, cwd, runs):
+    env = {**os.environ, "PYTHONPATH": SRC, "API_TOKEN": "bench", "USER_KEY": "bench"}
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env,
+                             capture_output=True, text=True, check=True).stdout.split()
+        results.append(out)
+    return results
+
+
+def median(results, column):
+    return statistics.median(float(r[column]) for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--proxies", type=int, default=300)
+    args = parser.parse_args()
+
+    cwd = tempfile.mkdtemp(prefix="vimo-startup-")
+    shutil.copy(os.path.join(ROOT, "search_params.yaml"), cwd)
+    proxies = [f"10.{i // 256}.{i % 256}.1:8080" for i in range(args.proxies)]
+    with open(os.path.join(cwd, "proxies.txt"), "w") as f:
+        f.write("\n".join(proxies))
+    with open(os.path.join(cwd, "proxy_catalog.json"), "w") as f:
+        json.dump({"fetched_at": time.time(), "proxies": {
+            f"http://{p}": {"validated_at": time.time(), "latency": 1.0, "success": 1.0, "alive": True}
+            for p in proxies}}, f)
+    rows = "".join(f"<tr><td>{p.split(':')[0]}</td><td>8080</td><td>NL</td><td>anonymous</td></tr>" for p in proxies)
+    with open(os.path.join(cwd, "page.html"), "w") as f:
+        f.write(f'<html><body><div class="table-responsive fpl-list"><table><tbody>{rows}</tbody></table></div></body></html>')
+
+    utils_runs = run(IMPORT_UTILS, cwd, args.runs)
+    print(f"import utils:       {median(utils_runs, 0) * 1000:7.1f} ms "
+          f"(bs4 loaded: {utils_runs[0][1]}, yaml loaded: {utils_runs[0][2]})")
+    for label, path in (("cached catalog:", None), ("txt list:", "proxies.txt")):
+        results = run(CREATE_MONITOR.format(path=path), cwd, args.runs)
+        print(f"{label:<19} {median(results, 0) * 1000:7.1f} ms import main + "
+              f"{median(results, 1) * 1000:6.1f} ms create_monitor (bs4 loaded: {results[0][2]})")
+    scrape_runs = run(SCRAPE, cwd, args.runs)
+    print(f"scrape (avoided):   {median(scrape_runs, 0) * 1000:7.1f} ms for {scrape_runs[0][1]} proxies, "
+          f"plus the network fetch")
+    shutil.rmtree(cwd)
+
+
+if __name__ == "__main__":
+    main()
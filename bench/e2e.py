@@ -0,0 +1,208 @@
+"""End-to-end benchmark of the real monitor loop against local stand-ins.
+
+Starts bench/mock_vinted.py in a separate process (Vinted, proxies and the
+notification provider), drives VintedMonitor / AsyncVintedMonitor through
+refresh_clients, the polling loop and the notifier, then reports
+time-to-notification percentiles, requests per detected item, missed items
+and CPU / memory per hour of the monitor process. With --reload-at the
+search file is edited mid-run to check the hot reload.
+
+Run from the repo root: python bench/e2e.py --duration 60
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+import mock_vinted
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def rss_kib():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def build_searches(n):
+    """Pairs of searches on the same catalog with different price caps, so the planner has work to do."""
+    return [{
+        "catalog_ids[]": 100 + i // 2,
+        "order": "newest_first",
+        "price_to": 20 + 20 * (i % 2),
+        "currency": "EUR",
+        "per_page": 20,
+    } for i in range(n)]
+
+
+def edited_searches(searches):
+    """The searches minus the last pair, with one price cap raised and a pair on a new catalog added."""
+    edited = [dict(search_params) for search_params in searches[:-2]]
+    edited[1]["price_to"] = 60
+    n = len(searches)
+    return edited + [{**search_params, "catalog_ids[]": 100 + n} for search_params in build_searches(2)]
+
+
+def search_stream(search_params):
+    return json.loads(json.dumps(mock_vinted.stream_key(mock_vinted.query_params(search_params))))
+
+
+def expected_items(stats, searches, start, end):
+    """Items listed in [start, end) that at least one configured search should notify."""
+    wanted = {}
+    for search_params in searches:
+        wanted.setdefault(json.dumps(search_stream(search_params)), []).append(search_params)
+    expected = {}
+    for item_id, (listed_at, key, price) in stats["listed"].items():
+        if not start <= listed_at < end:
+            continue
+        for search_params in wanted.get(json.dumps(key), []):
+            if float(search_params.get("price_from", "-inf")) <= price <= float(search_params.get("price_to", "inf")):
+                expected[int(item_id)] = listed_at
+                break
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end detection latency benchmark")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds")
+    parser.add_argument("--searches", type=int, default=6)
+    parser.add_argument("--rate", type=float, default=0.05, help="new items per second per catalog")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-403", type=float, default=0.0)
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=None)
+    parser.add_argument("--burst-size", type=int, default=0)
+    parser.add_argument("--proxies", type=int, default=4)
+    parser.add_argument("--dead", type=int, default=1, help="how many of the proxies drop every connection")
+    parser.add_argument("--min-interval", type=float, default=1.0)
+    parser.add_argument("--max-interval", type=float, default=10.0)
+    parser.add_argument("--budget", type=float, default=120, help="starting requests per minute per proxy")
+    parser.add_argument("--rotate", type=float, default=20, help="PROXY_ROTATE_TIME override, seconds")
+    parser.add_argument("--reload-at", type=float, default=None,
+                        help="seconds into the run at which search_params.yaml is edited")
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    args = parser.parse_args()
+
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=mock_vinted.serve, daemon=True, args=(
+        ready, args.rate, args.latency, args.error_403, args.error_429,
+        args.burst_every, args.burst_size, args.proxies, args.dead, 0))
+    server.start()
+    base_url, proxy_urls = ready.get(timeout=10)
+
+    os.chdir(tempfile.mkdtemp(prefix="vimo-bench-"))
+    start_import = time.perf_counter()
+    import monitor
+    import async_monitor
+    from notifier import NotificationDispatcher
+    from proxies import ProxyHealthChecker
+    from scheduler import PollScheduler
+    from governor import RateGovernor
+    from watcher import SearchParamsWatcher
+    import_time = time.perf_counter() - start_import
+
+    # benchmark pacing: no multi-second seeding pauses, faster rotation
+    monitor.random_sleeptime = lambda: 0
+    monitor.PROXY_ROTATE_TIME = async_monitor.PROXY_ROTATE_TIME = args.rotate
+
+    searches = build_searches(args.searches)
+    monitor_cls = async_monitor.AsyncVintedMonitor if args.use_async else monitor.VintedMonitor
+    m = monitor_cls(proxy_urls, searches, "token", "chat", base_url=base_url)
+    host, port = base_url.rsplit("/", 1)[1].split(":")
+    m.notifier = NotificationDispatcher(m.logger, "token", "chat", host=host, port=int(port),
+                                        use_https=False, min_interval=0.05)
+    m.scheduler = PollScheduler(m.queries, min_interval=args.min_interval,
+                                max_interval=args.max_interval, budget_per_min=args.budget)
+    m.governor = RateGovernor(rate=args.budget / 60, max_rate=args.budget / 30)
+    m.healthchecker = ProxyHealthChecker(m.proxymanager, url=f"{base_url}/health", interval=30, logger=m.logger)
+    m.healthchecker.start()
+    if args.reload_at is not None:
+        with open("search_params.yaml", "w") as f:
+            json.dump({"search_params": searches}, f)  # JSON is valid YAML
+        m.watcher = SearchParamsWatcher("search_params.yaml", interval=0.5, logger=m.logger)
+
+    boot_start = time.time()
+    threading.Thread(target=m.run, daemon=True).start()
+    # booted once every query has been seeded or loaded from the warm state
+    while not all(m.warmstate.search_state(query.key)[1] for query in m.queries.values()):
+        time.sleep(0.05)
+    window_start = time.time()
+    boot_time = window_start - boot_start
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    rss_start = rss_kib()
+
+    reload_times = []
+    if args.reload_at is not None:
+        time.sleep(args.reload_at)
+        edited = edited_searches(searches)
+        reload_times.append(time.time())
+        with open("search_params.yaml", "w") as f:
+            json.dump({"search_params": edited}, f)
+        while m.search_params_list is searches:
+            time.sleep(0.05)
+        reload_times.append(time.time())
+        time.sleep(max(0.0, window_start + args.duration - time.time()))
+    else:
+        time.sleep(args.duration)
+    window_end = time.time()
+    usage_end = resource.getrusage(resource.RUSAGE_SELF)
+    rss_end = rss_kib()
+    time.sleep(args.max_interval + 2)  # let the last listed items be polled and sent
+
+    with urllib.request.urlopen(f"{base_url}/__stats") as response:
+        stats = json.load(response)
+    if reload_times:
+        edited_at, applied_at = reload_times
+        expected = {**expected_items(stats, searches, window_start, edited_at),
+                    **expected_items(stats, edited, applied_at, window_end)}
+        # items the edit newly matches that were listed over a poll cycle before it, these must not be sent
+        old = edited_at - args.max_interval
+        backlog = set(expected_items(stats, edited, 0, old)) - set(expected_items(stats, searches, 0, old))
+    else:
+        expected = expected_items(stats, searches, window_start, window_end)
+    notified = {int(k): v for k, v in stats["notified"].items()}
+    delays = [notified[item_id] - listed_at for item_id, listed_at in expected.items() if item_id in notified]
+    missed = len(expected) - len(delays)
+    requests = stats["requests"]
+
+    cpu = (usage_end.ru_utime - usage_start.ru_utime) + (usage_end.ru_stime - usage_start.ru_stime)
+    hours = (window_end - window_start) / 3600
+    print(f"engine: {'async' if args.use_async else 'sync'}, searches: {len(searches)} -> queries: {len(m.queries)}, "
+          f"proxies: {args.proxies} ({args.dead} dead)")
+    print(f"startup: import {import_time * 1000:.0f} ms, boot to first poll {boot_time:.2f} s")
+    print(f"detected: {len(delays)}/{len(expected)} items, missed: {missed}")
+    if reload_times:
+        print(f"reload: applied {applied_at - edited_at:.2f}s after the edit, {len(m.queries)} queries, "
+              f"{len(backlog & set(notified))}/{len(backlog)} pre-edit backlog items notified")
+    print("time to notification: " + ", ".join(
+        f"p{p} {percentile(delays, p):.2f}s" for p in (50, 90, 99)) + f", max {max(delays, default=float('nan')):.2f}s")
+    print(f"requests: api {requests['api']}, cookie {requests['cookie']}, 403 {requests['403']}, 429 {requests['429']}, "
+          f"per detected item {requests['api'] / max(1, len(delays)):.2f}")
+    print(f"notifications: {requests['notify']} sends, notifier {m.notifier.stats()}")
+    print(f"session pool: {m.sessionpool.stats()}")
+    print(f"governor: {m.governor.stats()}")
+    print(f"metrics: {m.metrics.summary()}")
+    print(f"cpu: {cpu:.2f} s ({cpu / hours:.0f} s/hour), rss: {rss_end / 1024:.1f} MiB "
+          f"({(rss_end - rss_start) / 1024 / hours:+.1f} MiB/hour), "
+          f"peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
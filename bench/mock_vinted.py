@@ -0,0 +1,311 @@
+"""Local stand-in for Vinted, the notification providers and HTTP proxies.
+
+MockVinted serves cookie issuance on any non-API path, /api/v2/catalog/items
+with scriptable item arrivals, latency and 403/429 rates, and accepts
+Telegram/Pushover sends so time-to-notification can be measured (or refuses
+them with scripted replies). MockProxy
+is a plain HTTP forward proxy that can be switched dead.
+
+Run standalone to serve in a separate process (so its CPU does not count
+against the monitor): python bench/mock_vinted.py --help
+"""
+import http.client
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_PATH = "/api/v2/catalog/items"
+STREAM_IGNORED = {"time", "page", "per_page", "price_from", "price_to", "order", "currency"}
+ITEM_URL = re.compile(r"/items/(\d+)")
+
+
+def stream_key(params):
+    """Items are shared by queries that only differ in paging or price limits."""
+    return tuple(sorted((k, tuple(v)) for k, v in params.items() if k not in STREAM_IGNORED))
+
+
+def query_params(search_params):
+    """A search from search_params.yaml as the server parses its query string."""
+    return {k: [str(x) for x in v] if isinstance(v, list) else [str(v)] for k, v in search_params.items()}
+
+
+class CatalogStream:
+    """Items arriving as a Poisson process, plus optional periodic bursts."""
+
+    def __init__(self, server, key, rate, burst_every=None, burst_size=0):
+        self.server = server
+        self.key = key
+        self.rate = rate
+        self.burst_every = burst_every
+        self.burst_size = burst_size
+        self.items = []  # (id, listed_at, price), oldest first
+        now = time.time()
+        self.next_arrival = now + server.random.expovariate(rate) if rate > 0 else float("inf")
+        self.next_burst = now + burst_every if burst_every else float("inf")
+
+    def advance(self, now):
+        while min(self.next_arrival, self.next_burst) <= now:
+            if self.next_arrival <= self.next_burst:
+                self.items.append(self.server.new_item(self.next_arrival, self.key))
+                self.next_arrival += self.server.random.expovariate(self.rate)
+            else:
+                for _ in range(self.burst_size):
+                    self.items.append(self.server.new_item(self.next_burst, self.key))
+                self.next_burst += self.burst_every
+
+    def page(self, params, now):
+        self.advance(now)
+        price_from = float(params.get("price_from", ["-inf"])[0])
+        price_to = float(params.get("price_to", ["inf"])[0])
+        per_page = int(params.get("per_page", ["20"])[0])
+        page = int(params.get("page", ["1"])[0])
+        matching = [item for item in reversed(self.items) if price_from <= item[2] <= price_to]
+        return matching[(page - 1) * per_page:page * per_page]
+
+
+class MockVinted:
+    def __init__(self, rate=0.2, latency=0.02, latency_jitter=0.01,
+                 error_403=0.0, error_429=0.0, burst_every=None, burst_size=0, seed=None):
+        self.rate = rate
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_403 = error_403
+        self.error_429 = error_429
+        self.burst_every = burst_every
+        self.burst_size = burst_size
+        self.random = random.Random(seed)
+
+        self.streams = {}
+        self.listed = {}  # item id -> (listed_at, stream key, price)
+        self.notified = {}  # item id -> first notification time
+        self.notify_replies = []  # (status, body, headers) answered to the next sends instead of accepting them
+        self.requests = {"cookie": 0, "api": 0, "notify": 0, "403": 0, "429": 0}
+        self._ids = itertools.count(5_000_000_000)
+        self._lock = threading.Lock()
+        self._server = None
+        self.base_url = None
+
+    def new_item(self, listed_at, key):
+        item_id = next(self._ids)
+        price = round(self.random.uniform(3, 60), 1)
+        self.listed[item_id] = (listed_at, key, price)
+        return item_id, listed_at, price
+
+    def stream(self, params):
+        """The stream serving a parsed query string, created on first use. Call with the lock held."""
+        key = stream_key(params)
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = CatalogStream(self, key, self.rate, self.burst_every, self.burst_size)
+        return stream
+
+    def add_items(self, search_params, count):
+        """List `count` items at once on the stream of a search, returns their IDs oldest first."""
+        now = time.time()
+        with self._lock:
+            stream = self.stream(query_params(search_params))
+            items = [self.new_item(now, stream.key) for _ in range(count)]
+            stream.items.extend(items)
+        return [item_id for item_id, _, _ in items]
+
+    def bump(self, search_params, item_id):
+        """Move a listed item back to the top of its stream, like a bumped listing."""
+        with self._lock:
+            stream = self.stream(query_params(search_params))
+            item = next(item for item in stream.items if item[0] == item_id)
+            stream.items.remove(item)
+            stream.items.append(item)
+
+    def catalog(self, params):
+        with self._lock:
+            items = self.stream(params).page(params, time.time())
+        return {"items": [{
+            "id": item_id,
+            "title": f"Mock item {item_id}",
+            "price": {"amount": f"{price}", "currency_code": "EUR"},
+            "brand_title": "Mock",
+            "size_title": "M",
+            "url": f"{self.base_url}/items/{item_id}",
+            "user": {"id": item_id % 1000, "login": f"seller{item_id % 1000}"},
+            "photo": {"url": f"{self.base_url}/photo/{item_id}.jpg"},
+        } for item_id, _, price in items]}
+
+    def record_notification(self, text):
+        now = time.time()
+        with self._lock:
+            self.requests["notify"] += 1
+            for item_id in ITEM_URL.findall(text):
+                self.notified.setdefault(int(item_id), now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "listed": {item_id: [listed_at, key, price] for item_id, (listed_at, key, price) in self.listed.items()},
+                "notified": dict(self.notified),
+                "requests": dict(self.requests),
+            }
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                if url.path == "/__stats":
+                    return self.reply(200, json.dumps(mock.stats()).encode(), [("Content-Type", "application/json")])
+                if url.path == "/health":
+                    return self.reply(200, b"ok")
+                time.sleep(max(0.0, mock.random.gauss(mock.latency, mock.latency_jitter)))
+                roll = mock.random.random()
+                if roll < mock.error_403:
+                    mock.requests["403"] += 1
+                    return self.reply(403, b"Forbidden")
+                if roll < mock.error_403 + mock.error_429:
+                    mock.requests["429"] += 1
+                    return self.reply(429, b"Too Many Requests", [("Retry-After", "2")])
+                if url.path == API_PATH:
+                    mock.requests["api"] += 1
+                    body = json.dumps(mock.catalog(urllib.parse.parse_qs(url.query))).encode()
+                    return self.reply(200, body, [("Content-Type", "application/json")])
+                mock.requests["cookie"] += 1
+                token = f"mock{mock.requests['cookie']}"
+                self.reply(200, b"<html></html>", [("Set-Cookie", f"access_token_web={token}; Path=/")])
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+                text = (form.get("text") or form.get("message") or [""])[0]
+                with mock._lock:
+                    scripted = mock.notify_replies.pop(0) if mock.notify_replies else None
+                if scripted is not None:
+                    return self.reply(*scripted)
+                mock.record_notification(text)
+                self.reply(200, b'{"ok":true}', [("Content-Type", "application/json")])
+
+        return Handler
+
+    def start(self, port=0):
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class MockProxy:
+    """Plain-HTTP forward proxy; when dead it drops every connection."""
+
+    def __init__(self, dead=False, latency=0.0):
+        self.dead = dead
+        self.latency = latency
+        self.forwarded = 0
+        self._server = None
+        self.url = None
+
+    def handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def forward(self):
+                if proxy.dead:
+                    self.close_connection = True
+                    return
+                time.sleep(proxy.latency)
+                url = urllib.parse.urlsplit(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else None
+                headers = {k: v for k, v in self.headers.items() if k.lower() not in ("proxy-connection", "connection")}
+                conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+                path = url.path + (f"?{url.query}" if url.query else "")
+                conn.request(self.command, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                conn.close()
+                proxy.forwarded += 1
+                self.send_response(response.status)
+                for name, value in response.getheaders():
+                    if name.lower() not in ("content-length", "transfer-encoding", "connection"):
+                        self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = forward
+            do_POST = forward
+
+        return Handler
+
+    def start(self, port=0):
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def serve(ready, rate, latency, error_403, error_429, burst_every, burst_size, proxies, dead, seed):
+    """Process entry point: start the stand-ins and report their URLs on `ready`."""
+    mock = MockVinted(rate=rate, latency=latency, latency_jitter=latency / 2,
+                      error_403=error_403, error_429=error_429,
+                      burst_every=burst_every, burst_size=burst_size, seed=seed)
+    base_url = mock.start()
+    proxy_urls = [MockProxy(dead=i < dead).start() for i in range(proxies)]
+    ready.put((base_url, proxy_urls))
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    import argparse
+    import queue
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=0.2, help="new items per second per catalog stream")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-403", type=float, default=0.0)
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=None)
+    parser.add_argument("--burst-size", type=int, default=0)
+    parser.add_argument("--proxies", type=int, default=0)
+    parser.add_argument("--dead", type=int, default=0)
+    args = parser.parse_args()
+    ready = queue.Queue()
+    threading.Thread(target=serve, daemon=True, args=(ready, args.rate, args.latency, args.error_403, args.error_429,
+                                                      args.burst_every, args.burst_size, args.proxies, args.dead, None)).start()
+    base_url, proxy_urls = ready.get()
+    print(f"Mock Vinted at {base_url}")
+    for url in proxy_urls:
+        print(f"Proxy at {url}")
+    threading.Event().wait()
@@ -0,0 +1,140 @@
+"""Capture and replay benchmark.
+
+Without --capture, writes a synthetic capture first: --queries catalog
+queries polled --responses times each, with new listings arriving and a
+share of the listed items repriced, some of them below the price drop
+threshold. It then reports:
+
+- capture: time per recorded response (segment append + price index update),
+  segment count and compression ratio
+- scan: a full memory-mapped read of every segment, and rebuilding the
+  price index from it
+- replay: the responses fed back through a VintedMonitor's parse, match and
+  notify path at --speed (0 for as fast as possible), with new-item
+  notifications and price drop alerts counted instead of sent
+
+A real capture (CAPTURE_DIR) is replayed against the searches in
+--search-params, whose queries must match the captured ones.
+
+Run from the repo root: python bench/replay.py
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from capture import Capture, PriceIndex, read_responses, replay, segments
+from planner import plan_queries
+from records import ItemRecord
+from watcher import load_search_params
+
+
+def build_searches(n):
+    return [{"search_text": "", "catalog_ids": str(2000 + i), "order": "newest_first", "per_page": 96}
+            for i in range(n)]
+
+
+def synthetic_capture(directory, searches, responses, new_per_poll, reprice, drop_share, seed=1):
+    """Write a capture of every query's polls, returns (seconds per response, drops, raw bytes, bytes on disk)."""
+    rng = random.Random(seed)
+    capture = Capture(directory)
+    next_id, now, drops, elapsed = 1, 1_700_000_000.0, 0, 0.0
+    listed = {}
+    for query in plan_queries(searches):
+        listed[query.key] = []
+    for poll in range(responses):
+        for key, items in listed.items():
+            added = rng.randint(0, new_per_poll * 2)
+            for _ in range(added):
+                items.insert(0, ItemRecord(next_id, f"Item {next_id}", f"https://www.vinted.nl/items/{next_id}",
+                                           f"{rng.randint(5, 200)}.0", "EUR", f"Brand {next_id % 40}",
+                                           rng.choice(("S", "M", "L", "XL")), f"seller{next_id % 500}"))
+                next_id += 1
+            del items[96:]
+            if poll:
+                listed_before = items[added:]
+                for item in rng.sample(listed_before, int(len(listed_before) * reprice)):
+                    previous = float(item.price)
+                    item.price = f"{previous * (0.7 if rng.random() < drop_share else 0.95):.1f}"
+                    drops += float(item.price) <= previous * (1 - capture.index.drop_min)
+            now += 2.0
+            start = time.perf_counter()
+            capture.record(key, items, seed=poll == 0, now=now)
+            elapsed += time.perf_counter() - start
+    capture.close()
+    raw, written = capture.writer.raw_bytes, capture.writer.written_bytes
+    return elapsed / (responses * len(listed)), drops, raw, written
+
+
+class CountingNotifier:
+    def __init__(self):
+        self.new_items = 0
+        self.price_drops = 0
+
+    def submit(self, message):
+        if message.startswith("📉"):
+            self.price_drops += 1
+        else:
+            self.new_items += 1
+
+    def stop(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture scan and replay benchmark")
+    parser.add_argument("--capture", default=None, help="capture directory to replay, synthetic when omitted")
+    parser.add_argument("--search-params", default=None, help="searches of a real capture")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--responses", type=int, default=500, help="polls per query of the synthetic capture")
+    parser.add_argument("--new", type=int, default=3, help="mean new listings per poll")
+    parser.add_argument("--reprice", type=float, default=0.02, help="share of listed items repriced per poll")
+    parser.add_argument("--drops", type=float, default=0.5, help="share of repricings past the drop threshold")
+    parser.add_argument("--speed", type=float, default=0, help="replay speed-up, 0 for as fast as possible")
+    args = parser.parse_args()
+
+    directory = args.capture
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="vimo-capture-")
+        searches = build_searches(args.queries)
+        per_response, drops, raw, written = synthetic_capture(
+            directory, searches, args.responses, args.new, args.reprice, args.drops)
+        print(f"capture: {args.queries} queries x {args.responses} responses, "
+              f"{per_response * 1e6:.0f} µs per recorded response, {drops} price drops written")
+        print(f"segments: {len(segments(directory))}, {written / 2**20:.1f} MiB on disk, "
+              f"compression {raw / written:.1f}x")
+    else:
+        directory = os.path.abspath(directory)
+        searches = load_search_params(args.search_params) if args.search_params else load_search_params()
+
+    start = time.perf_counter()
+    count = sum(1 for _ in read_responses(directory))
+    scan = time.perf_counter() - start
+    index = PriceIndex(os.path.join(tempfile.mkdtemp(prefix="vimo-index-"), "prices.db"))
+    start = time.perf_counter()
+    index.rebuild(read_responses(directory))
+    rebuild = time.perf_counter() - start
+    index.close()
+    print(f"scan: {count} responses in {scan:.2f} s ({count / scan:.0f}/s), "
+          f"index rebuild {rebuild:.2f} s ({count / rebuild:.0f}/s)")
+
+    os.chdir(tempfile.mkdtemp(prefix="vimo-replay-"))
+    from monitor import VintedMonitor
+    # alerts need a price index, a fresh one so the replayed prices are compared again
+    m = VintedMonitor(["http://127.0.0.1:1"], searches, "token", "chat", capture_dir="capture")
+    m.notifier.stop()
+    m.notifier = CountingNotifier()
+    start = time.perf_counter()
+    fed = replay(m, read_responses(directory), speed=args.speed or None)
+    elapsed = time.perf_counter() - start
+    m.close()
+    print(f"replay: {fed} responses in {elapsed:.2f} s ({fed / elapsed:.0f}/s), "
+          f"{m.notifier.new_items} new item notifications, {m.notifier.price_drops} price drop alerts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from monitor import VintedMonitor
+from utils import (
+    create_async_api_client,
+    api_headers,
+    fetch_search_async,
+    retry_after
+)
+from config import (BASE_URL, PROXY_ROTATE_TIME, TRIES, MAX_PAGES,
+                    ASYNC_CONCURRENCY, GOVERNOR_MAX_WAIT, CAPTURE_DIR, STATE_DB)
+
+
+class AsyncVintedMonitor(VintedMonitor):
+    """Polls every planned query concurrently, each pinned to its own proxy session.
+
+    Startup (warm state, seeding) is shared with VintedMonitor; only the
+    polling loop differs. Handling responses commits to SQLite, writes the
+    capture and claims items from the coordinator, so that runs on one
+    background thread instead of the event loop.
+    """
+
+    def __init__(self, proxy_list,
+                 search_params_list,
+                 API_TOKEN,
+                 USER_KEY,
+                 base_url=BASE_URL,
+                 concurrency=ASYNC_CONCURRENCY,
+                 proxymanager=None,
+                 dedup=None,
+                 log_name="vimo",
+                 capture_dir=CAPTURE_DIR,
+                 state_db=STATE_DB):
+        super().__init__(proxy_list, search_params_list, API_TOKEN, USER_KEY, base_url=base_url,
+                         proxymanager=proxymanager, dedup=dedup, log_name=log_name, capture_dir=capture_dir,
+                         state_db=state_db)
+        self.concurrency = concurrency
+        self.leased = {}  # query id -> proxy url
+        self.sessions = {}  # query id -> (proxy url, api client, created, cookie)
+        self.tasks = {}  # query id -> poll_query task
+        self.limiter = None
+        self.loop = None
+        self.main_task = None
+        self.state_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state")  # one writer at a time
+
+    async def alog_request(self, request: httpx.Request):
+        self.log_request(request)
+
+    def aresponse_hook(self, proxy_url):
+        async def ahook(response: httpx.Response):
+            await response.aread()
+            self.record_response(proxy_url, response)
+        return ahook
+
+    async def refresh_session(self, q):
+        """Take a pooled session whose proxy is not pinned to another query.
+
+        The query's current client is kept, with its open connections, when
+        the new session goes through the same proxy; otherwise it is closed.
+        """
+        in_use = {proxy for other, proxy in self.leased.items() if other != q}
+        session = await asyncio.to_thread(self.sessionpool.acquire, in_use)
+        self.leased[q] = session.proxy_url
+        self.logger.info("Query %s: refreshed proxy: %s with cookie: ...%.20s", q, session.proxy_url, session.cookie,
+                         extra={"search": q, "proxy": session.proxy_url})
+        previous = self.sessions.get(q)
+        if previous is not None and previous[0] == session.proxy_url:
+            api_client = previous[1]
+            api_client.headers = api_headers(session.user_agent, session.cookie)
+        else:
+            api_client = create_async_api_client(session.user_agent, session.proxy_url, session.cookie,
+                                                 request_hooks=[self.alog_request],
+                                                 response_hooks=[self.aresponse_hook(session.proxy_url)])
+            if previous is not None:
+                await previous[1].aclose()
+        return session.proxy_url, api_client, time.time(), session.cookie
+
+    async def fetch_query(self, q, page=1):
+        search_params = {**self.queries[q].params, "time": int(time.time())}
+        if page > 1:
+            search_params["page"] = page
+        return await self.fetch_async(q, search_params)
+
+    async def fetch_async(self, q, search_params):
+        """Fetch one API page through the query's session, replacing the session until one answers."""
+        while True:
+            proxy_url, api_client, client_time, cookie = self.sessions[q]
+            wait = self.governor.reserve(proxy_url, cookie)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with self.limiter:
+                status_code, data = await fetch_search_async(api_client, self.api_url, params=search_params, tries=TRIES, logger=self.logger)
+            if status_code == 200:
+                self.governor.success(proxy_url, cookie)
+                return data
+            if status_code == 429:
+                pause = self.governor.throttled(proxy_url, cookie, retry_after(data))
+                if pause <= GOVERNOR_MAX_WAIT:
+                    continue
+                self.logger.info("Query %s: proxy %s throttled for %.0fs, switching proxy", q, proxy_url, pause,
+                                 extra={"search": q, "proxy": proxy_url, "status": 429, "pause": pause})
+                self.proxymanager.penalize(proxy_url, pause)
+            else:
+                self.metrics.fetch_failures.inc(("api",))
+                self.logger.info("Marking proxy: %s as down for assumed %d min.", proxy_url, self.proxymanager.cooldown / 60,
+                                 extra={"search": q, "proxy": proxy_url})
+                self.proxymanager.mark_failed(proxy_url)
+                self.logger.info("Query %s: refreshing session due to failure", q, extra={"search": q})
+            async with self.limiter:
+                self.sessions[q] = await self.refresh_session(q)
+
+    async def in_state_thread(self, func, *args):
+        """Run blocking state work on the state thread, in submission order."""
+        return await asyncio.get_running_loop().run_in_executor(self.state_thread, func, *args)
+
+    async def poll(self, q):
+        start = time.time()
+        mark = self.high_water.get(q)
+        new_ids, top_id, exhausted = await self.in_state_thread(self.handle_response, q, await self.fetch_query(q), mark)
+        page = 1
+        while exhausted and page < MAX_PAGES:
+            page += 1
+            self.logger.info("Query %s: page %d entirely new, fetching page %d", q, page - 1, page, extra={"search": q})
+            more_ids, _, exhausted = await self.in_state_thread(self.handle_response, q,
+                                                                await self.fetch_query(q, page), mark)
+            new_ids += more_ids
+        await self.in_state_thread(self.finish_poll, q, top_id)
+        self.metrics.observe_poll(q, page, len(new_ids), time.time() - start)
+        return new_ids
+
+    async def poll_query(self, q):
+        async with self.limiter:
+            self.sessions[q] = await self.refresh_session(q)
+        try:
+            if q in self.unseeded:
+                await self.in_state_thread(self.record_seed, q, await self.fetch_async(q, self.seed_params(q)))
+            while not self._stop.is_set():
+                new_ids = await self.poll(q)
+                delay = self.scheduler.record(q, len(new_ids))
+                self.logger.info("Query %s: %s", q, self.scheduler.describe(q), extra={"search": q})
+                self.report_status()
+                proxy_url, api_client, client_time, _ = self.sessions[q]
+                if (time.time() - client_time) > PROXY_ROTATE_TIME:
+                    self.logger.info("Query %s: refreshing session due to time limit.", q, extra={"search": q})
+                    async with self.limiter:
+                        self.sessions[q] = await self.refresh_session(q)
+                # every query has its own proxy here, so only that proxy's pace applies
+                await asyncio.sleep(max(delay, self.governor.interval(self.sessions[q][0])))
+        finally:
+            self.leased.pop(q, None)
+            session = self.sessions.pop(q, None)
+            if session is not None:
+                await session[1].aclose()
+
+    async def run_async(self):
+        self.loop = asyncio.get_running_loop()
+        self.main_task = asyncio.current_task()
+        self.boot()
+        self.api_client.close()
+        self.api_client = None
+        self.limiter = asyncio.Semaphore(self.concurrency)
+        self.tasks = {q: asyncio.create_task(self.poll_query(q)) for q in self.queries}
+        try:
+            while not self._stop.is_set():
+                check = self.watcher.interval if self.watcher is not None else None
+                done, _ = await asyncio.wait(self.tasks.values(), timeout=check,
+                                             return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    task.result()  # re-raise the error that ended a poll loop
+                search_params_list = self.watcher.poll() if self.watcher is not None else None
+                if search_params_list is not None:
+                    await self.reload_async(search_params_list)
+        finally:
+            for task in self.tasks.values():
+                task.cancel()
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+    def seed_added(self, queries):
+        pass  # each added query's task seeds it before its first poll, see poll_query
+
+    async def reload_async(self, search_params_list):
+        """Reload on the state thread, so no response is handled against half-swapped searches.
+
+        A removed query's task may still trip over its missing query before
+        it is cancelled; that error is dropped with the task.
+        """
+        added, removed = await self.in_state_thread(self.reload, search_params_list)
+        cancelled = [self.tasks.pop(q) for q in removed]
+        for task in cancelled:
+            task.cancel()
+        for q in added:
+            self.tasks[q] = asyncio.create_task(self.poll_query(q))
+        await asyncio.gather(*cancelled, return_exceptions=True)
+        return added, removed
+
+    def stop(self):
+        super().stop()
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.main_task.cancel)
+
+    def close(self):
+        self.stop()
+        self.state_thread.shutdown()  # let a running commit finish before the database closes
+        super().close()
+
+    def run(self):
+        try:
+            asyncio.run(self.run_async())
+        except asyncio.CancelledError:
+            if not self._stop.is_set():
+                raise
@@ -0,0 +1,251 @@
+import glob
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from records import ItemRecord
+from planner import item_price
+from config import CAPTURE_CHUNK, CAPTURE_SEGMENT_BYTES, PRICE_DROP_MIN
+
+# A segment is a sequence of frames: this header, then a zlib-compressed
+# chunk of JSON lines, one captured response per line.
+FRAME = struct.Struct("<II")  # compressed length, crc32 of the compressed bytes
+SEGMENT_SUFFIX = ".seg"
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    item_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (item_id, ts)
+) WITHOUT ROWID;
+"""
+
+
+def item_row(item: ItemRecord) -> List:
+    return [item.id, item.price, item.currency, item.title, item.brand, item.size, item.seller, item.url]
+
+
+def api_item(row: List) -> Dict:
+    """A captured row back in the shape of a catalog API item."""
+    item_id, price, currency, title, brand, size, seller, url = row
+    return {"id": item_id, "title": title, "url": url,
+            "price": {"amount": price, "currency_code": currency},
+            "brand_title": brand, "size_title": size, "user": {"login": seller}}
+
+
+class SegmentWriter:
+    """Appends captured responses to compressed segments in `directory`.
+
+    Responses are buffered and written `chunk` at a time as one frame; a new
+    segment is started once the current one passes `segment_bytes`. A frame
+    cut short by a crash fails its checksum and ends the segment for readers.
+    """
+
+    def __init__(self, directory, chunk=CAPTURE_CHUNK, segment_bytes=CAPTURE_SEGMENT_BYTES):
+        self.directory = directory
+        self.chunk = chunk
+        self.segment_bytes = segment_bytes
+        self.buffer = []
+        self.file = None
+        self.raw_bytes = 0
+        self.written_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, response: Dict):
+        self.buffer.append(json.dumps(response, separators=(",", ":"), ensure_ascii=False))
+        if len(self.buffer) >= self.chunk:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        raw = ("\n".join(self.buffer) + "\n").encode("utf-8")
+        payload = zlib.compress(raw)
+        self.buffer.clear()
+        if self.file is None or self.file.tell() > self.segment_bytes:
+            if self.file is not None:
+                self.file.close()
+            path = os.path.join(self.directory, f"{time.time_ns()}{SEGMENT_SUFFIX}")
+            self.file = open(path, "ab")
+        self.file.write(FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.file.flush()
+        self.raw_bytes += len(raw)
+        self.written_bytes += FRAME.size + len(payload)
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class SegmentReader:
+    """Reads one segment through a memory map, a chunk at a time."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def chunks(self) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offset = 0
+                while offset + FRAME.size <= len(mm):
+                    length, crc = FRAME.unpack_from(mm, offset)
+                    start = offset + FRAME.size
+                    payload = mm[start:start + length]
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        return  # torn write at the end of the segment
+                    yield zlib.decompress(payload)
+                    offset = start + length
+
+    def responses(self) -> Iterator[Dict]:
+        for chunk in self.chunks():
+            for line in chunk.splitlines():
+                yield json.loads(line)
+
+
+def segments(directory) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, f"*{SEGMENT_SUFFIX}")))
+
+
+def read_responses(directory) -> Iterator[Dict]:
+    """Every captured response in `directory`, oldest first."""
+    for path in segments(directory):
+        yield from SegmentReader(path).responses()
+
+
+class PriceIndex:
+    """Item ID -> price history, one row per observed price change."""
+
+    def __init__(self, path, drop_min=PRICE_DROP_MIN):
+        self.path = path
+        self.drop_min = drop_min
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(INDEX_SCHEMA)
+
+    def latest(self, item_ids: List[int]) -> Dict[int, float]:
+        prices = {}
+        for i in range(0, len(item_ids), 500):
+            batch = item_ids[i:i + 500]
+            rows = self.conn.execute(
+                # SQLite takes the bare `price` column from the row holding MAX(ts)
+                f"SELECT item_id, price, MAX(ts) FROM prices WHERE item_id IN ({','.join('?' * len(batch))}) "
+                "GROUP BY item_id", batch).fetchall()
+            prices.update((item_id, price) for item_id, price, _ in rows)
+        return prices
+
+    def update(self, items: Iterable[ItemRecord], now=None) -> List[Tuple[ItemRecord, float]]:
+        """Record new and changed prices, returns (item, previous price) for items that got cheaper."""
+        now = time.time() if now is None else now
+        priced = [(item, price) for item in items if (price := item_price(item)) is not None]
+        if not priced:
+            return []
+        known = self.latest([item.id for item, _ in priced])
+        changed, drops = [], []
+        for item, price in priced:
+            previous = known.get(item.id)
+            if previous == price:
+                continue
+            changed.append((item.id, now, price))
+            if previous is not None and price <= previous * (1 - self.drop_min):
+                drops.append((item, previous))
+        self.conn.executemany("INSERT OR REPLACE INTO prices (item_id, ts, price) VALUES (?, ?, ?)", changed)
+        return drops
+
+    def history(self, item_id: int) -> List[Tuple[float, float]]:
+        """(time, price) pairs of an item, oldest first."""
+        return self.conn.execute("SELECT ts, price FROM prices WHERE item_id = ? ORDER BY ts",
+                                 (item_id,)).fetchall()
+
+    def rebuild(self, responses: Iterable[Dict]) -> int:
+        """Refill the index from captured responses, returns how many were read."""
+        with self.conn:
+            self.conn.execute("DELETE FROM prices")
+        count = 0
+        for count, response in enumerate(responses, 1):
+            self.update([ItemRecord.from_item(api_item(row)) for row in response["i"]], now=response["t"])
+            if count % 1000 == 0:
+                self.commit()
+        self.commit()
+        return count
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+class Capture:
+    """Keeps every parsed catalog response: compact item rows in segments, prices in an index."""
+
+    def __init__(self, directory, chunk=CAPTURE_CHUNK, segment_bytes=CAPTURE_SEGMENT_BYTES, drop_min=PRICE_DROP_MIN):
+        self.writer = SegmentWriter(directory, chunk, segment_bytes)
+        self.index = PriceIndex(os.path.join(directory, "prices.db"), drop_min)
+
+    def record(self, key: str, items: List[ItemRecord], seed=False, now=None):
+        """Capture one response of the query with `key`, returns the price drops it shows."""
+        now = time.time() if now is None else now
+        response = {"t": now, "k": key, "i": [item_row(item) for item in items]}
+        if seed:
+            response["s"] = 1
+        self.writer.append(response)
+        drops = self.index.update(items, now)
+        if not self.writer.buffer:
+            self.index.commit()  # a chunk just went to disk
+        return drops
+
+    def close(self):
+        self.writer.close()
+        self.index.close()
+
+
+class CapturedResponse:
+    """Stands in for an httpx.Response in the monitor pipeline."""
+
+    __slots__ = ("content",)
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+
+def replay(monitor, responses: Iterable[Dict], speed: Optional[float] = 60.0) -> int:
+    """Feed captured responses through a monitor's parse, match and notify path.
+
+    Gaps between responses are replayed `speed` times faster, or not at all
+    when `speed` is None. Responses of queries the monitor does not have are
+    skipped. A monitor with a capture records the replayed responses again,
+    so point it at another directory. Returns how many responses were fed.
+    """
+    queries = {query.key: q for q, query in monitor.queries.items()}
+    start = first = None
+    count = 0
+    for response in responses:
+        q = queries.get(response["k"])
+        if q is None:
+            continue
+        if start is None:
+            start, first = time.time(), response["t"]
+        elif speed:
+            delay = (response["t"] - first) / speed - (time.time() - start)
+            if delay > 0:
+                time.sleep(delay)
+        data = CapturedResponse(json.dumps({"items": [api_item(row) for row in response["i"]]}).encode())
+        if response.get("s"):
+            monitor.record_seed(q, data)
+        else:
+            _, top_id, _ = monitor.handle_response(q, data, monitor.high_water.get(q))
+            monitor.finish_poll(q, top_id)
+        count += 1
+    return count
@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from utils import scrape_proxies
+from config import PROXY_CATALOG, PROXY_CATALOG_TTL, PROXY_CATALOG_MIN_LIVE, PROXY_CATALOG_SYNC
+
+
+class ProxyCatalog:
+    """Scraped proxies cached on disk with their last validation time and score.
+
+    Starting from the cached file needs no network round trip or HTML
+    parsing; the catalog is re-scraped in the background once it is older
+    than `ttl` or fewer than `min_live` proxies still pass health checks.
+    """
+
+    def __init__(self, path=PROXY_CATALOG, ttl=PROXY_CATALOG_TTL, min_live=PROXY_CATALOG_MIN_LIVE, logger=None):
+        self.path = path
+        self.ttl = ttl
+        self.min_live = min_live
+        self.logger = logger or logging.getLogger(__name__)
+        self.fetched_at = 0.0
+        self.entries = {}  # proxy url -> {"validated_at", "latency", "success", "alive"}
+        self.manager = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.info(f"Ignoring unreadable proxy catalog {self.path}: {e}")
+            return
+        self.fetched_at = data.get("fetched_at", 0.0)
+        self.entries = data.get("proxies", {})
+
+    def save(self):
+        with self._lock:
+            data = {"fetched_at": self.fetched_at, "proxies": dict(self.entries)}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def proxies(self):
+        """Cached proxies, live ones first, best score first."""
+        def rank(item):
+            entry = item[1]
+            return (not entry.get("alive", True), entry.get("latency", 0) / max(entry.get("success", 1), 0.05))
+        return [proxy for proxy, _ in sorted(self.entries.items(), key=rank)]
+
+    def live(self):
+        return sum(1 for entry in self.entries.values() if entry.get("alive", True))
+
+    def needs_refresh(self, now=None):
+        now = time.time() if now is None else now
+        return now - self.fetched_at > self.ttl or self.live() < self.min_live
+
+    def refresh(self):
+        """Scrape a fresh list and merge it in, keeping the health of known proxies. Returns the new proxies."""
+        start = time.perf_counter()
+        scraped = [f"http://{proxy}" for proxy in scrape_proxies()]
+        now = time.time()
+        with self._lock:
+            # forget proxies that have been dead for a whole TTL
+            self.entries = {proxy: entry for proxy, entry in self.entries.items()
+                            if entry.get("alive", True) or (entry.get("validated_at") or 0) > now - self.ttl}
+            added = [proxy for proxy in scraped if proxy not in self.entries]
+            for proxy in added:
+                self.entries[proxy] = {"validated_at": None, "alive": True}
+            self.fetched_at = now
+        self.logger.info(f"Proxy catalog refreshed in {time.perf_counter() - start:.1f}s: "
+                         f"{len(scraped)} scraped, {len(added)} new, {len(self.entries)} total")
+        self.save()
+        return added
+
+    def sync(self, manager):
+        """Copy the manager's health view into the catalog, for proxies it has observed."""
+        with self._lock:
+            for proxy, stats in list(manager.stats.items()):
+                if not stats.samples and "latency" not in self.entries.get(proxy, {}):
+                    continue
+                entry = self.entries.setdefault(proxy, {"validated_at": None})
+                if stats.last_ok is not None:
+                    entry["validated_at"] = stats.last_ok
+                entry["latency"] = stats.latency
+                entry["success"] = stats.success
+                entry["alive"] = manager._is_alive(proxy) and stats.success >= 0.5
+
+    def _loop(self):
+        while True:
+            try:
+                if self.needs_refresh():
+                    self.manager.add(self.refresh())
+            except Exception:
+                self.logger.exception("Proxy catalog refresh failed")
+            if self._stop.wait(PROXY_CATALOG_SYNC):
+                return
+            try:
+                self.sync(self.manager)
+                self.save()
+            except Exception:
+                self.logger.exception("Proxy catalog update failed")
+
+    def start(self, manager):
+        """Seed the manager with the cached scores, then keep the catalog in sync in the background."""
+        self.manager = manager
+        manager.restore({proxy: (entry["latency"], entry["success"])
+                         for proxy, entry in self.entries.items() if "latency" in entry})
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="proxy-catalog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.manager is not None:
+            self.sync(self.manager)
+            self.save()
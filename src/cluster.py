@@ -0,0 +1,439 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from monitor import VintedMonitor
+from async_monitor import AsyncVintedMonitor
+from notifier import notify
+from planner import plan_queries
+from proxies import RotatingProxyManager, ProxyHealthChecker
+from seen import SeenStore
+from jsonlog import start_logging, stop_logging
+from config import (BASE_URL, ASYNC_ENGINE, METRICS_PORT, CLUSTER_HEARTBEAT, CLUSTER_WORKER_TIMEOUT,
+                    CLUSTER_LEASE_GRACE, CLUSTER_RESPAWN_DELAY, CAPTURE_DIR, STATE_DB)
+
+# Methods of Coordinator that workers may call over the manager connection.
+EXPOSED = ("register", "unregister", "shard", "heartbeat", "lease", "mark_failed", "penalize", "claim",
+           "claim_price_drops", "info")
+
+
+def assign_shards(keys, workers):
+    """Map each worker to the indices of the keys it owns, at most ceil(n / workers) each.
+
+    A key goes to its highest-ranked worker by rendezvous hash that still has
+    room, so a worker joining or leaving moves few keys.
+    """
+    shards = {worker: [] for worker in workers}
+    if not workers:
+        return shards
+    room = -(-len(keys) // len(workers))
+    for i in sorted(range(len(keys)), key=keys.__getitem__):
+        ranked = sorted(workers, key=lambda w: hashlib.sha1(f"{w}/{keys[i]}".encode()).digest(), reverse=True)
+        owner = next(w for w in ranked if len(shards[w]) < room)
+        shards[owner].append(i)
+    return shards
+
+
+class Coordinator:
+    """Shared state of a sharded deployment: shard assignment, proxy leases, seen IDs and high-water marks.
+
+    Workers reach it through a multiprocessing manager, locally or over TCP.
+    A proxy is leased to at most one worker at a time; leases are dropped
+    when the worker stops reporting the proxy in use or stops heartbeating.
+    Workers report their queries' marks with each heartbeat, so a query that
+    moves to another worker resumes from its mark instead of being re-seeded.
+    """
+
+    def __init__(self, proxy_list, search_params_list, worker_timeout=CLUSTER_WORKER_TIMEOUT, logger=None):
+        self.proxymanager = RotatingProxyManager(proxy_list)
+        self.healthchecker = None
+        self.search_params_list = search_params_list
+        self.queries = plan_queries(search_params_list)
+        self.worker_timeout = worker_timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.seen = SeenStore()
+        self.price_drops = {}  # item id -> price its latest drop was alerted at, oldest alert first
+        self.workers = {}  # name -> last heartbeat
+        self.shards = {}  # name -> query indices
+        self.marks = {}  # query key -> (newest high-water mark reported, reported at)
+        self.leases = {}  # proxy -> [worker name, leased at, heartbeats missing from]
+        self.version = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rebalance(self):
+        shards = assign_shards([query.key for query in self.queries], sorted(self.workers))
+        if shards != self.shards:
+            self.shards = shards
+            self.version += 1
+            self.logger.info(f"Shards v{self.version}: " + ", ".join(
+                f"{name}: {len(indices)} queries" for name, indices in shards.items()))
+
+    def _release_all(self, name):
+        for proxy in [proxy for proxy, lease in self.leases.items() if lease[0] == name]:
+            del self.leases[proxy]
+
+    def register(self, name):
+        with self._lock:
+            self.workers[name] = time.time()
+            self._rebalance()
+        self.logger.info(f"Worker {name} joined")
+
+    def unregister(self, name):
+        with self._lock:
+            if self.workers.pop(name, None) is None:
+                return
+            self._release_all(name)
+            self._rebalance()
+        self.logger.info(f"Worker {name} left, shards rebalanced")
+
+    def update(self, search_params_list):
+        """Replace the searches; workers pick up their new shard at the next heartbeat."""
+        with self._lock:
+            self.search_params_list = search_params_list
+            self.queries = plan_queries(search_params_list)
+            keys = {query.key for query in self.queries}
+            self.marks = {key: mark for key, mark in self.marks.items() if key in keys}
+            self.shards = {}
+            self._rebalance()
+        self.logger.info(f"Searches reloaded: {len(search_params_list)} searches -> {len(self.queries)} queries")
+
+    def shard(self, name):
+        """Return (version, search params, {query key: (mark, reported at)}) for a worker's searches."""
+        with self._lock:
+            indices = self.shards.get(name, ())
+            keys = [self.queries[q].key for q in indices]
+            return (self.version,
+                    [self.search_params_list[s] for q in indices for s in self.queries[q].members],
+                    {key: self.marks[key] for key in keys if key in self.marks})
+
+    def heartbeat(self, name, in_use, records, marks=()):
+        """Keep a worker alive, feed in its proxy samples and query marks, drop the leases it no longer uses.
+
+        Returns (shard version, leased proxies of this worker that went into cooldown).
+        """
+        now = time.time()
+        for proxy, latency, ok in records:
+            self.proxymanager.record(proxy, latency, ok)
+        in_use = set(in_use)
+        with self._lock:
+            for key, mark in marks:
+                previous = self.marks.get(key)
+                self.marks[key] = (max(mark, previous[0]) if previous else mark, now)
+            if name not in self.workers:
+                self.logger.info(f"Worker {name} came back")
+                self.workers[name] = now
+                self._rebalance()
+            self.workers[name] = now
+            cooling = []
+            for proxy, lease in list(self.leases.items()):
+                if lease[0] != name:
+                    continue
+                if proxy in in_use or now - lease[1] < CLUSTER_LEASE_GRACE:
+                    lease[2] = 0
+                else:
+                    # missing from two heartbeats in a row, not just caught mid-swap
+                    lease[2] += 1
+                    if lease[2] >= 2:
+                        del self.leases[proxy]
+                        continue
+                if not self.proxymanager._is_alive(proxy):
+                    cooling.append(proxy)
+            return self.version, cooling
+
+    def lease(self, name):
+        with self._lock:
+            if name not in self.workers:
+                raise RuntimeError(f"Worker {name} is not registered")
+            proxy = self.proxymanager.get_next_proxy(exclude=self.leases)
+            self.leases[proxy] = [name, time.time(), 0]
+        return proxy
+
+    def mark_failed(self, name, proxy):
+        self.proxymanager.mark_failed(proxy)
+        with self._lock:
+            if self.leases.get(proxy, [None])[0] == name:
+                del self.leases[proxy]
+
+    def penalize(self, proxy, seconds):
+        self.proxymanager.penalize(proxy, seconds)
+
+    def claim(self, item_ids):
+        """Return the IDs no worker has claimed before; the caller notifies only those."""
+        with self._lock:
+            return [item_id for item_id in item_ids if self.seen.add(item_id)]
+
+    def claim_price_drops(self, drops):
+        """Return the IDs of (item id, price) drops no worker has alerted at this price or lower."""
+        with self._lock:
+            claimed = []
+            for item_id, price in drops:
+                alerted = self.price_drops.pop(item_id, None)
+                if alerted is None or price < alerted:
+                    claimed.append(item_id)
+                    alerted = price
+                self.price_drops[item_id] = alerted
+            while len(self.price_drops) > self.seen.capacity:
+                del self.price_drops[next(iter(self.price_drops))]
+            return claimed
+
+    def info(self):
+        return self.proxymanager.proxies, self.proxymanager.cooldown
+
+    def reap(self):
+        now = time.time()
+        with self._lock:
+            dead = [name for name, last in self.workers.items() if now - last > self.worker_timeout]
+            for name in dead:
+                del self.workers[name]
+                self._release_all(name)
+            if dead:
+                self._rebalance()
+        for name in dead:
+            self.logger.info(f"Worker {name} missed its heartbeats, shards rebalanced")
+        return dead
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self.workers),
+                "version": self.version,
+                "leases": len(self.leases),
+                "claimed": len(self.seen),
+            }
+
+    def _loop(self):
+        while not self._stop.wait(CLUSTER_HEARTBEAT):
+            try:
+                self.reap()
+            except Exception:
+                self.logger.exception("Coordinator reap failed")
+
+    def start(self):
+        if self.healthchecker is None:
+            self.healthchecker = ProxyHealthChecker(self.proxymanager, logger=self.logger)
+            self.healthchecker.start()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="coordinator", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.healthchecker is not None:
+            self.healthchecker.stop()
+
+
+class ClusterManager(BaseManager):
+    pass
+
+
+def serve(coordinator, address, authkey):
+    """Serve the coordinator to workers from a thread of this process."""
+    ClusterManager.register("coordinator", callable=lambda: coordinator, exposed=EXPOSED)
+    server = ClusterManager(address=address, authkey=authkey).get_server()
+    threading.Thread(target=server.serve_forever, name="cluster-server", daemon=True).start()
+    return server
+
+
+def connect(address, authkey):
+    ClusterManager.register("coordinator", exposed=EXPOSED)
+    manager = ClusterManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.coordinator()
+
+
+class LeasedProxyManager:
+    """Worker-side stand-in for RotatingProxyManager that leases proxies from the coordinator.
+
+    Proxy samples are buffered and sent with the next heartbeat instead of
+    one round trip per response.
+    """
+
+    def __init__(self, coordinator, name):
+        self.coordinator = coordinator
+        self.name = name
+        self.proxies, self.cooldown = coordinator.info()
+        self.failed = {}
+        self.records = []
+        self._lock = threading.Lock()
+
+    def get_next_proxy(self):
+        return self.coordinator.lease(self.name)
+
+    def _is_alive(self, proxy):
+        return time.time() >= self.failed.get(proxy, 0)
+
+    def record(self, proxy, latency, ok):
+        with self._lock:
+            self.records.append((proxy, latency, ok))
+
+    def take_records(self):
+        with self._lock:
+            records, self.records = self.records, []
+        return records
+
+    def mark_failed(self, proxy):
+        self.failed[proxy] = time.time() + self.cooldown
+        self.coordinator.mark_failed(self.name, proxy)
+
+    def penalize(self, proxy, seconds):
+        self.failed[proxy] = max(self.failed.get(proxy, 0), time.time() + seconds)
+        self.coordinator.penalize(proxy, seconds)
+
+
+class ShardWorker:
+    """Runs a monitor on the searches the coordinator assigns, rebuilding it when the shard changes."""
+
+    def __init__(self, address, authkey, name, API_TOKEN, USER_KEY, metrics_port=METRICS_PORT, base_url=BASE_URL):
+        self.coordinator = connect(address, authkey)
+        self.name = name
+        self.API_TOKEN = API_TOKEN
+        self.USER_KEY = USER_KEY
+        self.metrics_port = metrics_port
+        self.base_url = base_url
+        self.proxymanager = LeasedProxyManager(self.coordinator, name)
+        self.monitor = None
+        self.version = None
+        self.logger = logging.getLogger(f"ViMoWorker.{name}")
+        self._stop = threading.Event()
+
+    def claim(self, item_ids):
+        return self.coordinator.claim(list(item_ids))
+
+    def claim_price_drops(self, drops):
+        return self.coordinator.claim_price_drops(list(drops))
+
+    def in_use(self):
+        monitor = self.monitor
+        if monitor is None:
+            return []
+        proxies = {session.proxy_url for session in list(monitor.sessionpool.ready)}
+        proxies.add(getattr(monitor, "curr_proxy", None))
+        proxies.update(getattr(monitor, "leased", {}).values())
+        proxies.discard(None)
+        return list(proxies)
+
+    def marks(self):
+        """(query key, high-water mark) of every query the current monitor has a mark for."""
+        monitor = self.monitor
+        if monitor is None:
+            return []
+        queries = monitor.queries
+        return [(queries[q].key, mark) for q, mark in list(monitor.high_water.items()) if q in queries]
+
+    def _heartbeat(self):
+        while not self._stop.wait(CLUSTER_HEARTBEAT):
+            try:
+                version, cooling = self.coordinator.heartbeat(self.name, self.in_use(), self.proxymanager.take_records(),
+                                                              self.marks())
+            except Exception:
+                self.logger.exception("Heartbeat failed")
+                continue
+            for proxy in cooling:
+                self.proxymanager.failed.setdefault(proxy, time.time() + self.proxymanager.cooldown)
+            monitor = self.monitor
+            if monitor is not None and version != self.version:
+                monitor.logger.info(f"Shard changed (v{self.version} -> v{version}), restarting monitor")
+                monitor.stop()
+
+    def run(self):
+        monitor_cls = AsyncVintedMonitor if ASYNC_ENGINE else VintedMonitor
+        # local workers share a working directory, so each keeps its own state database
+        root, ext = os.path.splitext(STATE_DB)
+        state_db = f"{root}-{self.name}{ext}"
+        log_listener = start_logging(self.logger, f"worker-{self.name}")
+        self.coordinator.register(self.name)
+        threading.Thread(target=self._heartbeat, name="heartbeat", daemon=True).start()
+        first = True
+        try:
+            while True:
+                self.version, searches, marks = self.coordinator.shard(self.name)
+                if not searches:
+                    # more workers than queries, idle until a rebalance
+                    time.sleep(CLUSTER_HEARTBEAT)
+                    continue
+                self.monitor = monitor_cls(self.proxymanager.proxies, searches, self.API_TOKEN, self.USER_KEY,
+                                           base_url=self.base_url, proxymanager=self.proxymanager, dedup=self,
+                                           log_name=f"vimo-{self.name}",
+                                           capture_dir=os.path.join(CAPTURE_DIR, self.name) if CAPTURE_DIR else None,
+                                           state_db=state_db)
+                self.monitor.metrics_port = self.metrics_port
+                # queries taken over from another worker poll on from its mark instead of re-seeding
+                self.monitor.adopt_marks(marks)
+                # rebuilt on every shard change, only the first one tells the user it is booting
+                self.monitor.announce_boot, first = first, False
+                try:
+                    self.monitor.run()
+                finally:
+                    self.monitor.close()
+                    self.monitor = None
+        finally:
+            self._stop.set()
+            self.coordinator.unregister(self.name)
+            stop_logging(self.logger, log_listener)
+
+
+def run_worker(address, authkey, name, API_TOKEN, USER_KEY, metrics_port=METRICS_PORT, base_url=BASE_URL):
+    """Worker process entry point."""
+    ShardWorker(address, authkey, name, API_TOKEN, USER_KEY, metrics_port, base_url).run()
+
+
+def run_coordinator(proxy_list, search_params_list, API_TOKEN, USER_KEY, address, authkey, workers=0, catalog=None,
+                    watcher=None):
+    """Serve the coordinator and keep `workers` local worker processes alive.
+
+    A worker that exits is unregistered straight away so its shard moves to
+    the others, and restarted after CLUSTER_RESPAWN_DELAY. Remote workers
+    can join the same address with `main.py --join`. A proxy catalog, if
+    given, is kept in sync with the coordinator's proxy health. Edits seen
+    by the watcher, if given, are resharded to the workers.
+    """
+    logger = logging.getLogger("ViMoCoordinator")
+    log_listener = start_logging(logger, "coordinator")
+    if watcher is not None:
+        watcher.logger = logger
+
+    coordinator = Coordinator(proxy_list, search_params_list, logger=logger)
+    server = serve(coordinator, address, authkey)
+    coordinator.start()
+    if catalog is not None:
+        catalog.start(coordinator.proxymanager)
+    address = server.address
+    logger.info(f"Coordinator listening on {address[0]}:{address[1]}, "
+                f"{len(coordinator.queries)} queries, {len(proxy_list)} proxies")
+    print(f"Coordinator listening on {address[0]}:{address[1]}")
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = {}  # name -> process
+    restart_at = {f"worker{i}": 0.0 for i in range(workers)}
+    try:
+        while True:
+            now = time.time()
+            for slot, name in enumerate(restart_at):
+                process = processes.get(name)
+                if process is not None and not process.is_alive():
+                    del processes[name]
+                    coordinator.unregister(name)
+                    restart_at[name] = now + CLUSTER_RESPAWN_DELAY
+                    logger.error(f"Worker {name} exited with code {process.exitcode}, restarting in {CLUSTER_RESPAWN_DELAY}s")
+                    notify(logger, f"🚨 Worker {name} crashed (exit code {process.exitcode}), its searches moved to the other workers",
+                           API_TOKEN, USER_KEY)
+                elif process is None and now >= restart_at[name]:
+                    metrics_port = METRICS_PORT + 1 + slot if METRICS_PORT is not None else None
+                    process = ctx.Process(target=run_worker, name=name, daemon=True,
+                                          args=(address, authkey, name, API_TOKEN, USER_KEY, metrics_port))
+                    process.start()
+                    processes[name] = process
+            if watcher is not None:
+                search_params_list = watcher.poll()
+                if search_params_list is not None:
+                    coordinator.update(search_params_list)
+            time.sleep(1)
+    finally:
+        stop_logging(logger, log_listener)
@@ -1,6 +1,7 @@
 SESSION_COOKIE_NAME = "access_token_web"
 BASE_URL = "http://www.vinted.nl"
-API_URL = f"{BASE_URL}/api/v2/catalog/items"
+API_PATH = "/api/v2/catalog/items"
+API_URL = f"{BASE_URL}{API_PATH}"
 BASE_HEADERS = {
     #"Accept-Encoding": "gzi.ranp, deflate, br, zstd",
     "Accept-Encoding": "gzip, deflate, br, zstd",
@@ -13,12 +14,87 @@ SLEEPTIME_MIN = 10
 SLEEPTIME_CONST = 20
 SLEEPTIME_MAX = 30
 SLEEPTIME_LONG = 120
+SCHED_MIN_INTERVAL = SLEEPTIME_MIN  # fastest a single query is polled
+SCHED_MAX_INTERVAL = 15 * 60  # slowest a quiet query is polled
+SCHED_TARGET_NEW = 0.5  # aim for this many new items per poll
+SCHED_BUDGET_PER_MIN = 3  # max requests per minute per proxy
+SCHED_ALPHA = 0.2  # weight of the newest sample in the arrival-rate estimate
+SCHED_PRIOR_RATE = SCHED_TARGET_NEW / ((SLEEPTIME_MIN + SLEEPTIME_MAX) / 2)  # items/s assumed before any sample
+SCHED_MIN_RATE = 1 / 3600  # floor of the arrival-rate estimate, items/s
+SCHED_JITTER = 0.2  # +/- fraction of randomness on every poll interval
 PROXY_ROTATE_TIME = 7 * 60
-PROXY_COOLDOWN = 60 * 60
+PROXY_COOLDOWN = 60 * 60  # hard failures: proxy did not answer
+GOVERNOR_RATE = SCHED_BUDGET_PER_MIN / 60  # starting requests per second per proxy and per session
+GOVERNOR_MIN_RATE = 1 / 120
+GOVERNOR_MAX_RATE = 30 / 60
+GOVERNOR_BURST = 2  # requests that may go out back to back
+GOVERNOR_INCREASE = 0.002  # requests per second added to the rate after each success
+GOVERNOR_BACKOFF = 0.5  # rate multiplier after a 429
+GOVERNOR_PENALTY = 60  # seconds a throttled proxy pauses when the 429 has no Retry-After
+GOVERNOR_MAX_WAIT = 10  # wait out shorter throttles on the same session, switch proxy for longer ones
+GOVERNOR_IDLE = 60 * 60  # forget buckets unused for this long
+SESSION_POOL_SIZE = 3  # ready-to-use proxy sessions kept warm in the background
+SESSION_MAX_AGE = 30 * 60  # discard pooled sessions whose cookie is older than this
+SESSION_REFILL_CHECK = 30  # seconds between pool checks when nothing is acquired
+PROXY_SCORE_ALPHA = 0.3  # weight of the newest sample in the rolling proxy score
+PROXY_HANDOUT_PENALTY = 0.5  # seconds added to a proxy's score per handout, spreads load over equally good proxies
+PROXY_CHECK_URL = "http://www.gstatic.com/generate_204"
+PROXY_CHECK_INTERVAL = 5 * 60
+PROXY_CHECK_TIMEOUT = 5
+PROXY_CHECK_WORKERS = 32
+PROXY_CATALOG = "proxy_catalog.json"  # scraped proxies with their health, reused across restarts
+PROXY_CATALOG_TTL = 6 * 60 * 60  # re-scrape after this long
+PROXY_CATALOG_MIN_LIVE = 10  # or when fewer live proxies are left
+PROXY_CATALOG_SYNC = 5 * 60  # seconds between writing proxy health to the catalog
+SEARCH_PARAMS = "search_params.yaml"
+SEARCH_PARAMS_CHECK = 10  # seconds between checks of search_params.yaml for edits
 TRIES = 1
+MAX_PAGES = 5  # pages fetched per poll when a burst overflows the first page
 TIMEOUT = 20
+HTTP2 = False  # negotiate HTTP/2 on https connections, needs the h2 package (pip install httpx[http2])
+HTTP_MAX_CONNECTIONS = 10  # per client, HTTP/2 multiplexes requests over fewer of them
+HTTP_MAX_KEEPALIVE = 5  # idle connections kept open per client
+HTTP_KEEPALIVE_EXPIRY = 60  # seconds before an idle connection is closed
+
+ASYNC_ENGINE = False  # poll all searches concurrently, one proxy session per search
+ASYNC_CONCURRENCY = 4  # max requests in flight at once
+
+SEEN_MAX_ITEMS = 500_000  # ring buffer capacity of the seen-ID store
+SEEN_MAX_AGE = 14 * 24 * 60 * 60  # seconds, None to only evict by count
+STATE_DB = "state.db"
+WARMSTATE_STALE = 6 * 60 * 60  # re-seed a search if its state is older than this
+WARMSTATE_COMPACT_TIME = 24 * 60 * 60
+
+CLUSTER_PORT = 50710  # coordinator port when running sharded workers
+CLUSTER_HEARTBEAT = 5  # seconds between worker heartbeats
+CLUSTER_WORKER_TIMEOUT = 30  # a worker silent this long is dropped and its shard reassigned
+CLUSTER_LEASE_GRACE = 60  # seconds a new proxy lease is kept before the worker must report it in use
+CLUSTER_RESPAWN_DELAY = 60  # seconds before a crashed local worker is restarted
+
+CAPTURE_DIR = None  # keep every catalog response in compressed segments here, e.g. "capture"
+CAPTURE_CHUNK = 64  # responses per compressed chunk
+CAPTURE_SEGMENT_BYTES = 64 * 1024 * 1024  # start a new segment file past this size
+PRICE_DROP_ALERTS = True  # notify when an already seen item matching a search gets cheaper, needs CAPTURE_DIR
+PRICE_DROP_MIN = 0.1  # smallest relative drop worth an alert
+
+LOG_DIR = "logs"
+LOG_MAX_BYTES = 20 * 1024 * 1024  # roll a log over at this size
+LOG_ROTATE_TIME = 24 * 60 * 60  # or after this many seconds, whichever comes first
+LOG_BACKUPS = 30  # gzipped rollovers kept per log
+
+METRICS_PORT = 9108  # local Prometheus endpoint, None to disable
+METRICS_SUMMARY_INTERVAL = 6 * 60 * 60  # seconds between status summaries sent as notifications
+METRICS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20)  # latency histogram bounds, seconds
 
 NOTIFY_TYPE = "telegram"  # pushover or telegram
+NOTIFY_HOST = None  # override the provider host, e.g. for a local stand-in
+NOTIFY_PORT = None
+NOTIFY_HTTPS = True
+NOTIFY_MIN_INTERVAL = 1.0  # seconds between sends, Telegram allows ~1 msg/s per chat
+NOTIFY_DIGEST_THRESHOLD = 3  # queued messages at which a burst is merged into digests
+NOTIFY_DIGEST_MAX = 20  # max messages taken from the queue per send round
+NOTIFY_RETRIES = 3  # resends of a message the provider throttled (429) or failed on (5xx)
+NOTIFY_RETRY_DELAY = 5.0  # seconds before the first resend when the provider gives no retry_after, doubled after
 
 UA_LIST = [
         {"ua": "Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Mobile Safari/537.3", "pct": 63.11},
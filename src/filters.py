@@ -0,0 +1,111 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+from planner import item_price
+
+# Keys of a `filters` section in search_params.yaml. The top-level section
+# applies to every search; a search's own section extends its lists and
+# overrides its sizes.
+LIST_KEYS = ("include", "exclude", "include_regex", "exclude_regex", "exclude_sellers")
+SIZE_PRICES = "max_price_by_size"
+
+
+def keyword_pattern(words: Iterable[str]) -> str:
+    """One regex alternation for many keywords, factored into a trie.
+
+    Keywords sharing a prefix share one branch, so the regex engine tests
+    each prefix once instead of trying every keyword in turn.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return _trie_pattern(trie)
+
+
+def _trie_pattern(node: Dict) -> str:
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    if "" in node:
+        return "(?:" + "|".join(branches) + ")?"
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+def compile_pattern(keywords: List[str], regexes: List[str]) -> Optional["re.Pattern"]:
+    """Whole-word keywords and free regexes as one case-insensitive pattern, None if both are empty."""
+    parts = []
+    if keywords:
+        parts.append(r"\b" + keyword_pattern(keywords) + r"\b")
+    for regex in regexes:
+        try:
+            re.compile(regex)
+        except re.error as e:
+            raise ValueError(f"Invalid filter regex {regex!r}: {e}") from None
+        parts.append(f"(?:{regex})")
+    if not parts:
+        return None
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+class ItemFilter:
+    """The client-side filters of one search, compiled once at load."""
+
+    __slots__ = ("include", "exclude", "sellers", "size_prices")
+
+    def __init__(self, spec: Dict):
+        unknown = set(spec) - set(LIST_KEYS) - {SIZE_PRICES}
+        if unknown:
+            raise ValueError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+        self.include = compile_pattern(spec.get("include") or [], spec.get("include_regex") or [])
+        self.exclude = compile_pattern(spec.get("exclude") or [], spec.get("exclude_regex") or [])
+        self.sellers = frozenset(str(seller).lower() for seller in spec.get("exclude_sellers") or ())
+        self.size_prices = {str(size).lower(): float(price)
+                            for size, price in (spec.get(SIZE_PRICES) or {}).items()}
+
+    def __call__(self, item) -> bool:
+        title = item.title or ""
+        if self.include is not None and self.include.search(title) is None:
+            return False
+        if self.exclude is not None and self.exclude.search(title) is not None:
+            return False
+        if self.sellers and item.seller is not None and item.seller.lower() in self.sellers:
+            return False
+        if self.size_prices and item.size is not None:
+            max_price = self.size_prices.get(item.size.lower())
+            if max_price is not None:
+                price = item_price(item)
+                if price is not None and price > max_price:
+                    return False
+        return True
+
+
+def merge_specs(base: Optional[Dict], spec: Optional[Dict]) -> Dict:
+    merged = {}
+    for part in (base, spec):
+        for key, value in (part or {}).items():
+            if key in LIST_KEYS:
+                merged[key] = merged.get(key, []) + list(value or [])
+            elif key == SIZE_PRICES:
+                merged[key] = {**merged.get(key, {}), **(value or {})}
+            else:
+                merged[key] = value  # rejected by ItemFilter
+    return merged
+
+
+def with_global_filters(search_params_list: List[Dict], spec: Optional[Dict]) -> List[Dict]:
+    """Fold the top-level `filters` section into every search's own `filters`."""
+    if not spec:
+        return search_params_list
+    return [{**search_params, "filters": merge_specs(spec, search_params.get("filters"))}
+            for search_params in search_params_list]
+
+
+def compile_filters(search_params_list: List[Dict]) -> List[Optional[ItemFilter]]:
+    """One ItemFilter per search, None for searches without filters."""
+    return [ItemFilter(search_params["filters"]) if search_params.get("filters") else None
+            for search_params in search_params_list]
@@ -0,0 +1,103 @@
+import threading
+import time
+
+from config import (GOVERNOR_RATE, GOVERNOR_MIN_RATE, GOVERNOR_MAX_RATE, GOVERNOR_BURST,
+                    GOVERNOR_INCREASE, GOVERNOR_BACKOFF, GOVERNOR_PENALTY, GOVERNOR_IDLE)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def reserve(self, now):
+        """Take a token, returns seconds until it may be used; tokens go negative while queued."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - 1
+        self.updated = now
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+
+class RateGovernor:
+    """Paces API requests with a token bucket per proxy and per session.
+
+    Rates adapt additive-increase / multiplicative-decrease: each successful
+    request raises a bucket's rate by `increase`, a 429 multiplies it by
+    `backoff` and blocks the bucket for Retry-After (or `penalty`) seconds.
+    Throttling is a short pause, unlike the cooldown of a proxy that stopped
+    answering.
+    """
+
+    def __init__(self, rate=GOVERNOR_RATE, min_rate=GOVERNOR_MIN_RATE, max_rate=GOVERNOR_MAX_RATE,
+                 burst=GOVERNOR_BURST, increase=GOVERNOR_INCREASE, backoff=GOVERNOR_BACKOFF,
+                 penalty=GOVERNOR_PENALTY, idle=GOVERNOR_IDLE):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.backoff = backoff
+        self.penalty = penalty
+        self.idle = idle
+        self.buckets = {}
+        self.throttles = 0
+        self.pruned_at = time.time()
+        self._lock = threading.Lock()
+
+    def _buckets(self, proxy, session, now):
+        keys = [("proxy", proxy)] if session is None else [("proxy", proxy), ("session", session)]
+        buckets = []
+        for key in keys:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.rate, self.burst, now)
+            buckets.append(bucket)
+        return buckets
+
+    def _prune(self, now):
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if now - bucket.updated < self.idle}
+        self.pruned_at = now
+
+    def reserve(self, proxy, session=None, now=None):
+        """Reserve one request, returns the seconds to wait before sending it."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if now - self.pruned_at > self.idle:
+                self._prune(now)
+            return max(bucket.reserve(now) for bucket in self._buckets(proxy, session, now))
+
+    def success(self, proxy, session=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for bucket in self._buckets(proxy, session, now):
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+    def throttled(self, proxy, session=None, retry_after=None, now=None):
+        """Back off after a 429, returns how long the proxy is paused."""
+        now = time.time() if now is None else now
+        pause = self.penalty if retry_after is None else retry_after
+        with self._lock:
+            self.throttles += 1
+            for bucket in self._buckets(proxy, session, now):
+                bucket.rate = max(self.min_rate, bucket.rate * self.backoff)
+                bucket.tokens = min(bucket.tokens, 0)
+                bucket.blocked_until = max(bucket.blocked_until, now + pause)
+        return pause
+
+    def interval(self, proxy):
+        """Current seconds between requests through a proxy."""
+        bucket = self.buckets.get(("proxy", proxy))
+        return 1 / (bucket.rate if bucket is not None else self.rate)
+
+    def stats(self):
+        rates = [bucket.rate for (kind, _), bucket in list(self.buckets.items()) if kind == "proxy"]
+        return {
+            "throttles": self.throttles,
+            "proxies": len(rates),
+            "avg_rate_per_min": 60 * sum(rates) / len(rates) if rates else 60 * self.rate,
+        }
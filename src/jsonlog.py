@@ -0,0 +1,97 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import LOG_DIR, LOG_MAX_BYTES, LOG_ROTATE_TIME, LOG_BACKUPS
+
+# `extra=` keys copied into the JSON line when a record carries them
+FIELDS = ("search", "proxy", "status", "latency", "bytes", "method", "url", "item", "pause")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, message and the known extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in FIELDS:
+            value = record.__dict__.get(field)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RotatingJsonlHandler(RotatingFileHandler):
+    """Rolls over by size or age, whichever comes first; rolled files are gzipped."""
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, rotate_time=LOG_ROTATE_TIME, backups=LOG_BACKUPS):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self.rotate_time = rotate_time
+        self.rollover_at = time.time() + rotate_time
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_time
+
+    def rotation_filename(self, default_name):
+        return default_name + ".gz"
+
+    def rotate(self, source, dest):
+        if not os.path.exists(source):
+            return
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+class LazyQueueHandler(QueueHandler):
+    """Enqueues records as they are; the message is only formatted on the writer thread.
+
+    The stock QueueHandler formats in the caller so records can be pickled;
+    this queue never leaves the process, so that work is deferred too.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def start_logging(logger, name, directory=LOG_DIR):
+    """Send `logger` through a queue to a background writer of `<directory>/<name>.jsonl`.
+
+    Returns the QueueListener, pass it to stop_logging to flush and close.
+    """
+    os.makedirs(directory, exist_ok=True)
+    handler = RotatingJsonlHandler(os.path.join(directory, f"{name}.jsonl"))
+    handler.setFormatter(JsonFormatter())
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(LazyQueueHandler(records))
+    listener.start()
+    return listener
+
+
+def stop_logging(logger, listener):
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    listener.stop()  # writes out whatever is still queued
+    for handler in listener.handlers:
+        handler.close()
@@ -1,11 +1,17 @@
 import os
-import sys
 import time
+import socket
 import logging
+import argparse
 
 from monitor import VintedMonitor
+from async_monitor import AsyncVintedMonitor
 from notifier import notify
-from utils import load_yaml, load_txt_lines, scrape_and_save_proxies
+from cluster import run_coordinator, run_worker
+from watcher import load_search_params, SearchParamsWatcher
+from config import ASYNC_ENGINE, CLUSTER_PORT
+from catalog import ProxyCatalog
+from utils import load_txt_lines
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -16,49 +22,74 @@ USER_KEY = os.getenv("USER_KEY")
 if not API_TOKEN or not USER_KEY:
     raise ValueError("API_TOKEN and USER_KEY must be set in the .env file.")
 
-if not os.path.exists("logs"):
-    os.makedirs("logs")
-
 maxnum = 10
 
-def create_monitor():
-    # proxy list
-    if len(sys.argv) > 1 and sys.argv[1].endswith(".txt"):
-        proxy_list = load_txt_lines(sys.argv[1])
+def load_proxies(path=None):
+    """Proxies from a .txt list, or from the cached catalog (scraped on first use). Returns (proxies, catalog)."""
+    catalog = None
+    if path is not None and path.endswith(".txt"):
+        proxy_list = load_txt_lines(path)
     else:
-        scrape_and_save_proxies()
-        proxy_list = load_txt_lines("proxy_list.txt")
+        catalog = ProxyCatalog()
+        if not catalog.entries:
+            catalog.refresh()
+        proxy_list = catalog.proxies()
+        path = catalog.path
 
     if not proxy_list:
-        raise ValueError("proxy_list.txt is empty or could not be loaded.")
+        raise ValueError(f"{path} is empty or could not be loaded.")
     elif len(proxy_list) < 10:
-        print(f"Warning: proxy_list.txt contains only {len(proxy_list)} proxies")
+        print(f"Warning: {path} contains only {len(proxy_list)} proxies")
+    return proxy_list, catalog
+
+def create_monitor(proxy_path=None):
+    proxy_list, catalog = load_proxies(proxy_path)
+    search_params_list = load_search_params()
+    monitor_cls = AsyncVintedMonitor if ASYNC_ENGINE else VintedMonitor
+    monitor = monitor_cls(proxy_list, search_params_list, API_TOKEN, USER_KEY)
+    monitor.catalog = catalog
+    monitor.watcher = SearchParamsWatcher(logger=monitor.logger)
+    return monitor
 
-    # search params
-    config = load_yaml("search_params.yaml")
-    search_params_list = config.get("search_params")
-    if search_params_list is None:
-        raise KeyError("search_params.yaml must contain a 'search_params' key.")
-    
-    return VintedMonitor(proxy_list, search_params_list, API_TOKEN, USER_KEY)
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
 
-def close_logger(logger):
-    for handler in logger.handlers[:]:
-        handler.close()
-        logger.removeHandler(handler)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vinted notifier")
+    parser.add_argument("proxies", nargs="?", help="proxy list .txt, scraped when omitted")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="split the searches over this many worker processes")
+    parser.add_argument("--listen", type=parse_address, default=None,
+                        help=f"coordinator address HOST:PORT for remote workers (default 127.0.0.1:{CLUSTER_PORT})")
+    parser.add_argument("--join", type=parse_address, default=None,
+                        help="run as a worker of the coordinator at HOST:PORT")
+    parser.add_argument("--name", default=socket.gethostname(), help="worker name when joining")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
     print("""
           ***
           Warning! Vinted Terms of Service forbids scraping or automated tools.
           Usage may result in a permanent ban.
           ***
     """)
+    # workers authenticate with the coordinator using CLUSTER_KEY, or the API token
+    authkey = os.getenv("CLUSTER_KEY", API_TOKEN).encode()
+    if args.join is not None:
+        run_worker(args.join, authkey, args.name, API_TOKEN, USER_KEY)
+    elif args.workers or args.listen is not None:
+        proxy_list, catalog = load_proxies(args.proxies)
+        run_coordinator(proxy_list, load_search_params(), API_TOKEN, USER_KEY,
+                        args.listen or ("127.0.0.1", CLUSTER_PORT), authkey, workers=args.workers, catalog=catalog,
+                        watcher=SearchParamsWatcher())
+
     for num in range(1, maxnum + 1):
         monitor = None
         try:
-            monitor = create_monitor()
+            monitor = create_monitor(args.proxies)
             monitor.run()
 
         except Exception as e:
@@ -66,8 +97,8 @@ if __name__ == "__main__":
             monitor.logger.error(f"{num}/{maxnum}| Vinted notifier crashed: {e}")
             notify(monitor.logger, f"🚨 {num}/{maxnum} | Vinted notifier crashed: {e}", API_TOKEN, USER_KEY)
 
-            if monitor is not None and hasattr(monitor, "logger"):
-                close_logger(monitor.logger)
+            if monitor is not None:
+                monitor.close()
 
             print(f"{num}/{maxnum}| Main loop error occurred: {e}, restarting in 60 seconds...")
             time.sleep(60)
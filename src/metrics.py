@@ -0,0 +1,193 @@
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_BUCKETS
+
+# Labelled values are plain dict entries keyed on the label tuple. Updates
+# are unlocked to keep the hot path cheap; two threads racing on the same
+# label set can at worst lose an increment.
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, labels=(), value=1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def total(self):
+        return sum(self.values.values())
+
+    def samples(self):
+        for labels, value in list(self.values.items()):
+            yield self.name, tuple(zip(self.labelnames, labels)), value
+
+
+class Gauge(Counter):
+    """Value read from a callback at scrape time."""
+
+    def __init__(self, name, help, fn):
+        super().__init__(name, help)
+        self.fn = fn
+
+    def samples(self):
+        yield self.name, (), self.fn()
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=METRICS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.values = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, labels=()):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [0] * (len(self.buckets) + 2)
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def quantile(self, q, labels=None):
+        """Bucket upper bound below which a fraction q of observations fall."""
+        counts = [0] * (len(self.buckets) + 1)
+        for key, entry in list(self.values.items()):
+            if labels is None or key == labels:
+                counts = [a + b for a, b in zip(counts, entry[:-1])]
+        total = sum(counts)
+        if not total:
+            return None
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= q * total:
+                return bound
+
+    def samples(self):
+        for labels, entry in list(self.values.items()):
+            pairs = tuple(zip(self.labelnames, labels))
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry[:-1]):
+                running += count
+                yield f"{self.name}_bucket", pairs + (("le", "+Inf" if bound == float("inf") else repr(bound)),), running
+            yield f"{self.name}_sum", pairs, entry[-1]
+            yield f"{self.name}_count", pairs, running
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, fn):
+        return self.register(Gauge(name, help, fn))
+
+    def histogram(self, name, help, labelnames=(), buckets=METRICS_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            kind = "histogram" if isinstance(metric, Histogram) else "gauge" if isinstance(metric, Gauge) else "counter"
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            for name, pairs, value in metric.samples():
+                label_str = ",".join(f'{k}="{v}"' for k, v in pairs)
+                lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MonitorMetrics:
+    """All metrics the monitor records, on one registry."""
+
+    def __init__(self, registry=None):
+        self.registry = registry or Registry()
+        r = self.registry
+        self.started = time.time()
+        self.requests = r.counter("vimo_http_requests_total", "HTTP responses by client kind and status", ("kind", "status"))
+        self.request_seconds = r.histogram("vimo_http_request_seconds", "HTTP request latency", ("kind",))
+        self.response_bytes = r.counter("vimo_http_response_bytes_total", "Response bytes downloaded", ("kind",))
+        self.fetch_failures = r.counter("vimo_fetch_failures_total", "Fetches that gave up after all tries", ("kind",))
+        self.proxy_requests = r.counter("vimo_proxy_requests_total", "HTTP responses per proxy", ("proxy", "outcome"))
+        self.proxy_seconds = r.counter("vimo_proxy_request_seconds_total", "Summed request latency per proxy", ("proxy",))
+        self.polls = r.counter("vimo_query_polls_total", "Completed polls per query", ("query",))
+        self.pages = r.counter("vimo_query_pages_total", "Catalog pages fetched per query", ("query",))
+        self.new_items = r.counter("vimo_query_new_items_total", "New item IDs per query", ("query",))
+        self.filtered = r.counter("vimo_query_filtered_items_total", "New items dropped by price limits or filters", ("query",))
+        self.poll_seconds = r.histogram("vimo_query_poll_seconds", "Wall time of one poll, all pages", ("query",))
+        r.gauge("vimo_uptime_seconds", "Seconds since the monitor started", lambda: time.time() - self.started)
+
+    def observe_response(self, kind, proxy, status, latency, nbytes):
+        self.requests.inc((kind, status))
+        self.response_bytes.inc((kind,), nbytes)
+        outcome = "ok" if status < 400 else "error"
+        self.proxy_requests.inc((proxy, outcome))
+        if latency is not None:
+            self.request_seconds.observe(latency, (kind,))
+            self.proxy_seconds.inc((proxy,), latency)
+
+    def observe_poll(self, q, pages, new_count, seconds):
+        labels = (str(q),)
+        self.polls.inc(labels)
+        self.pages.inc(labels, pages)
+        self.new_items.inc(labels, new_count)
+        self.poll_seconds.observe(seconds, labels)
+
+    def summary(self):
+        hours = (time.time() - self.started) / 3600
+        api = sum(v for (kind, _), v in list(self.requests.values.items()) if kind == "api")
+        errors = sum(v for (_, status), v in list(self.requests.values.items()) if status >= 400)
+        p50 = self.request_seconds.quantile(0.5, ("api",))
+        p90 = self.request_seconds.quantile(0.9, ("api",))
+        return (f"{int(hours)} hours up, {self.requests.total():.0f} requests ({api:.0f} API, {errors:.0f} errors, "
+                f"{self.fetch_failures.total():.0f} failed fetches), {self.new_items.total():.0f} new items, "
+                f"API latency p50 <= {p50}s p90 <= {p90}s, {self.response_bytes.total() / 1e6:.1f} MB downloaded")
+
+
+class MetricsServer:
+    """Serves the registry at /metrics from a daemon thread."""
+
+    def __init__(self, registry, host="127.0.0.1", port=0):
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -2,65 +2,121 @@ import httpx
 import logging
 import time
 import datetime
+import threading
 from typing import Dict, Optional
 
-from proxies import RotatingProxyManager
+from proxies import RotatingProxyManager, ProxyHealthChecker
 from utils import (
-    create_cookie_client,
     create_api_client,
-    get_random_user_agent,
+    api_headers,
     random_sleeptime,
-    fetch_cookies,
-    fetch_search
+    fetch_search,
+    retry_after
 )
-from notifier import notify
+from notifier import NotificationDispatcher
+from seen import SeenStore
+from warmstate import WarmState
+from planner import plan_queries, query_shape, item_matches, item_price
+from filters import compile_filters
+from watcher import diff_searches
+from records import parse_catalog
+from sessions import SessionPool
+from metrics import MonitorMetrics, MetricsServer
+from scheduler import PollScheduler
+from governor import RateGovernor
+from capture import Capture
+from jsonlog import start_logging, stop_logging
 
-from config import (BASE_URL, API_URL, 
-                         SESSION_COOKIE_NAME, PROXY_ROTATE_TIME, TRIES)
-import state
+from config import (BASE_URL, API_PATH, PROXY_ROTATE_TIME, TRIES,
+                         SEEN_MAX_AGE, WARMSTATE_COMPACT_TIME, MAX_PAGES,
+                         METRICS_PORT, METRICS_SUMMARY_INTERVAL, GOVERNOR_MAX_WAIT,
+                         CAPTURE_DIR, PRICE_DROP_ALERTS, STATE_DB)
 
 class VintedMonitor:
     def __init__(self, proxy_list, 
                  search_params_list, 
                  API_TOKEN, 
-                 USER_KEY):
+                 USER_KEY,
+                 base_url=BASE_URL,
+                 proxymanager=None,
+                 dedup=None,
+                 log_name="vimo",
+                 capture_dir=CAPTURE_DIR,
+                 state_db=STATE_DB):
 
-        self.proxymanager = RotatingProxyManager(proxy_list)
+        # a sharded worker passes in the coordinator's proxy leases and dedup store
+        self.proxymanager = proxymanager or RotatingProxyManager(proxy_list)
+        self.dedup = dedup
+        self.healthchecker = None
+        self.catalog = None  # ProxyCatalog to keep in sync, when proxies come from the scraper
+        self.watcher = None  # SearchParamsWatcher to hot reload searches from
+        self.announce_boot = True  # a sharded worker only announces its first monitor
         self.proxy_list = proxy_list
         self.search_params_list = search_params_list
         self.API_TOKEN = API_TOKEN
         self.USER_KEY = USER_KEY
+        self.base_url = base_url
+        self.api_url = f"{base_url}{API_PATH}"
         
         self.start_time = time.time()
         self.newclient_time = time.time()
 
+        # JSON lines in logs/<log_name>.jsonl, written by a background thread
         self.logger = logging.getLogger("VintedMonitor")
-        self.logger.setLevel(logging.INFO)
-        file_handler = logging.FileHandler(f"logs/logfrom{datetime.datetime.now().strftime("%Y-%m-%d-%H:%M:%S")}.log")
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        self.logger.propagate = False
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
-
-        self.latest_request = None
+        self.log_listener = start_logging(self.logger, log_name)
+
+        self.notifier = NotificationDispatcher(self.logger, API_TOKEN, USER_KEY)
+
+        self.seen = SeenStore()
+        self.warmstate = WarmState(state_db)
+        # parsed responses and a price index, kept when a capture directory is set
+        self.capture = Capture(capture_dir) if capture_dir else None
+        self.filters = compile_filters(search_params_list)
+        # query id -> PlannedQuery; ids stay stable across reloads, new queries get fresh ids
+        self.queries = dict(enumerate(plan_queries(search_params_list)))
+        self.next_query = len(self.queries)
+        self.logger.info(f"Planner: {len(search_params_list)} searches -> {len(self.queries)} queries, "
+                         f"saving {len(search_params_list) - len(self.queries)} requests per cycle")
+        self.scheduler = PollScheduler(self.queries)
+        self.governor = RateGovernor()
+        self.high_water = {}  # query id -> newest item ID seen
+        self.unseeded = set()  # query ids added by a reload that still need seeding
+        self.compact_time = time.time()
+        self.metrics = MonitorMetrics()
+        self.metrics.registry.gauge("vimo_notify_queue_depth", "Notifications waiting to be sent", lambda: self.notifier.queue_depth)
+        self.metrics.registry.gauge("vimo_seen_ids", "Item IDs in the seen store", lambda: len(self.seen))
+        self.sessionpool = SessionPool(self.proxymanager, base_url=base_url, hooks=self.client_hooks,
+                                       metrics=self.metrics, logger=self.logger)
+        self.metrics.registry.gauge("vimo_session_pool_ready", "Pre-warmed sessions ready", lambda: len(self.sessionpool.ready))
+        self.metrics_port = METRICS_PORT
+        self.metrics_server = None
+        self.summary_time = time.time()
+        self.api_client = None
+        self._stop = threading.Event()
     
     def log_request(self, request: httpx.Request):
-        self.latest_request = {
-            "method": request.method,
-            "url": str(request.url),
-            "start": time.time(),
-        }
-
-    def log_response(self, response: httpx.Response):
-        if self.latest_request is None:
-            return 
-        duration = time.time() - self.latest_request["start"]
-        self.logger.info(
-            f'"{response.http_version.upper()} {response.status_code} {response.reason_phrase}" | '
-            f'{duration:.2f}s | '
-            f'{self.latest_request["method"]} {self.latest_request["url"]}'
-            )
-        self.latest_request = None 
+        request.extensions["vimo_start"] = time.time()
+
+    def record_response(self, proxy_url, response: httpx.Response):
+        """Log one response and feed it into the metrics and the proxy score."""
+        start = response.request.extensions.get("vimo_start")
+        latency = time.time() - start if start is not None else None
+        kind = "api" if response.request.url.path == API_PATH else "cookie"
+        self.metrics.observe_response(kind, proxy_url, response.status_code, latency, response.num_bytes_downloaded)
+        self.proxymanager.record(proxy_url, latency, response.status_code < 400)
+        self.logger.info('"%s %s %s" | %.2fs | %s %s',
+                         response.http_version, response.status_code, response.reason_phrase,
+                         latency or 0.0, response.request.method, response.request.url,
+                         extra={"proxy": proxy_url, "status": response.status_code, "latency": latency,
+                                "bytes": response.num_bytes_downloaded, "method": response.request.method,
+                                "url": response.request.url})
+
+    def response_hook(self, proxy_url):
+        def hook(response: httpx.Response):
+            response.read()
+            self.record_response(proxy_url, response)
+        return hook
+
     """
     # HTTPX request hook
     def log_request(self, request):
@@ -71,112 +127,389 @@ class VintedMonitor:
         self.logger.info(f'HTTP Response: "{response.http_version.upper()} {response.status_code} {response.reason_phrase}"')
     """
 
+    def client_hooks(self, proxy_url):
+        return [self.log_request], [self.response_hook(proxy_url)]
+
     def refresh_clients(self):
-        user_agent = get_random_user_agent()
-        proxy_url = self.proxymanager.get_next_proxy()
-        cookie_client = create_cookie_client(user_agent, proxy_url, 
-                                             request_hooks=[self.log_request],
-                                             response_hooks=[self.log_response])
-        session_cookie = fetch_cookies(cookie_client, BASE_URL, SESSION_COOKIE_NAME, tries=TRIES, logger=self.logger)
-        while session_cookie == -1:
-            self.logger.info(f"Marking proxy: {proxy_url} as down for assumed {int(self.proxymanager.cooldown / 60)} min.")
-            self.proxymanager.mark_failed(proxy_url)
-            user_agent = get_random_user_agent()
-            proxy_url = self.proxymanager.get_next_proxy()
-            cookie_client = create_cookie_client(user_agent, proxy_url, 
-                                                 request_hooks=[self.log_request],
-                                                 response_hooks=[self.log_response])
-            session_cookie = fetch_cookies(cookie_client, BASE_URL, SESSION_COOKIE_NAME, tries=TRIES, logger=self.logger)
-        self.logger.info("Refreshed proxy: " + str(proxy_url) + " with cookie: ..." + str(session_cookie)[:20])
-        api_client = create_api_client(user_agent, proxy_url, session_cookie,
-                                       request_hooks=[self.log_request],
-                                       response_hooks=[self.log_response])
+        """Swap in a pre-warmed session from the pool, returns (proxy, session, api client).
+
+        The current client is kept, with its open connections, when the new
+        session goes through the same proxy; only its headers change.
+        """
+        session = self.sessionpool.acquire()
+        self.logger.info("Refreshed proxy: %s with cookie: ...%.20s", session.proxy_url, session.cookie,
+                         extra={"proxy": session.proxy_url})
+        if self.api_client is not None and session.proxy_url == getattr(self, "curr_proxy", None):
+            api_client = self.api_client
+            api_client.headers = api_headers(session.user_agent, session.cookie)
+        else:
+            request_hooks, response_hooks = self.client_hooks(session.proxy_url)
+            api_client = create_api_client(session.user_agent, session.proxy_url, session.cookie,
+                                           request_hooks=request_hooks,
+                                           response_hooks=response_hooks)
+            if self.api_client is not None:
+                self.api_client.close()
         self.newclient_time = time.time()
-        return proxy_url, cookie_client, api_client
+        self.logger.info("Session pool: %s", self.sessionpool.stats())
+        return session.proxy_url, session, api_client
+
+    def seed_params(self, q):
+        query = self.queries[q]
+        return {**query.params, "per_page": 10 * query.params["per_page"], "time": int(time.time())}
+
+    def record_seed(self, q, data, verbose=False):
+        """Mark every item of a seeding response as seen, without notifying."""
+        records = parse_catalog(data.content)
+        if self.capture is not None:
+            self.capture.record(self.queries[q].key, records, seed=True)
+        if verbose:
+            self.logger.info("Query %s (searchconfigs %s):", q, self.queries[q].members, extra={"search": q})
+        item_ids = []
+        for i, item in enumerate(records):
+            self.seen.add(item.id)
+            item_ids.append(item.id)
+            if i < 4 and verbose:
+                self.logger.info("ID: %s, %s, URL: %s", item.id, item.title, item.url,
+                                 extra={"search": q, "item": item.id})
+        self.warmstate.add_seen(item_ids)
+        if self.dedup is not None:
+            self.dedup.claim(item_ids)
+        self.finish_poll(q, max(item_ids, default=None))
+        self.unseeded.discard(q)
+
+    def seed(self, q, verbose=False):
+        self.record_seed(q, self.fetch(self.seed_params(q)), verbose)
 
-    def collect_existing_ids(self):
-        items = []
+    def collect_existing_ids(self, indices=None):
+        if indices is None:
+            indices = list(self.queries)
         for firstloop in range(2):
-            for s, search_params in enumerate(self.search_params_list):
-                firstsearch_params = {**search_params}
-                firstsearch_params["per_page"] = 10 * firstsearch_params["per_page"]
-                firstsearch_params["time"] = int(time.time())
-                status_code, data = fetch_search(self.api_client, API_URL, params=firstsearch_params, tries=TRIES, logger=self.logger)
-                while status_code == -1:
-                    self.logger.info(f"Marking proxy: {self.curr_proxy} as down for assumed {int(self.proxymanager.cooldown / 60)} min.")
-                    self.proxymanager.mark_failed(self.curr_proxy)
-                    self.logger.info("Refreshing clients due to failure (firstsearch)")
-                    self.curr_proxy, self.cookie_client, self.api_client = self.refresh_clients()
-                    status_code, data = fetch_search(self.api_client, API_URL, params=firstsearch_params, tries=TRIES, logger=self.logger)
-
-                data = data.json()
-                if firstloop == 0:
-                    self.logger.info(f"Searchconfig {s}:")
-                for i, item in enumerate(data.get("items", [])):
-                    item_id, item_name, item_url = item.get("id"), item.get("title"), item.get("url")
-                    items.append(item_id)
-                    if i < 4 and firstloop == 0:
-                        self.logger.info(f"ID: {item_id}, {item_name}, URL: {item_url}")
+            for q in indices:
+                self.seed(q, verbose=firstloop == 0)
                 time.sleep(int(random_sleeptime()) / 2)
-        return list(set(items))
+        return self.seen
 
-    def run(self):
+    def adopt_marks(self, marks):
+        """Take over high-water marks reported elsewhere, {query key: (mark, reported at)}.
+
+        Newer than the state database, they count as fresh warm state, so
+        load_warm_state resumes those queries from the mark instead of seeding
+        them and swallowing whatever was listed in between.
+        """
+        for key, (mark, reported_at) in marks.items():
+            high_water, updated_at = self.warmstate.search_state(key)
+            if updated_at is None or updated_at < reported_at:
+                self.warmstate.touch_search(key, max(mark, high_water or mark), now=reported_at)
+
+    def load_warm_state(self):
+        """Load persisted seen IDs, return the indices of queries that still need seeding."""
+        start = time.perf_counter()
+        loaded = self.warmstate.load_seen(self.seen, max_age=SEEN_MAX_AGE)
+        stale = [q for q, query in self.queries.items() if self.warmstate.is_stale(query.key)]
+        for q, query in self.queries.items():
+            high_water, _ = self.warmstate.search_state(query.key)
+            if high_water is not None:
+                self.high_water[q] = high_water
+        self.logger.info(f"Loaded {loaded} seen IDs from {self.warmstate.path} in {(time.perf_counter() - start) * 1000:.1f} ms, "
+                         f"{len(stale)}/{len(self.queries)} queries need seeding")
+        return stale
+
+    def start_metrics_server(self):
+        """Serve /metrics on metrics_port; the monitor runs on without it if the port cannot be bound."""
+        if self.metrics_port is None or self.metrics_server is not None:
+            return
+        try:
+            self.metrics_server = MetricsServer(self.metrics.registry, port=self.metrics_port)
+        except OSError as e:
+            self.logger.error(f"Metrics endpoint disabled, cannot listen on port {self.metrics_port}: {e}")
+            return
+        self.metrics_server.start()
+        self.logger.info(f"Metrics at http://127.0.0.1:{self.metrics_server.port}/metrics")
+
+    def boot(self):
+        self.notifier.start()
         self.logger.info("Booting ViMo...")
         print(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " - " + "Booting ViMo...")
-        notify(self.logger, "⏳ Booting ViMo...", self.API_TOKEN, self.USER_KEY)
+        if self.announce_boot:
+            self.notifier.submit("⏳ Booting ViMo...")
                 
-        self.curr_proxy, self.cookie_client, self.api_client = self.refresh_clients()
-        items = self.collect_existing_ids()
+        if self.catalog is not None:
+            self.catalog.start(self.proxymanager)
+        if self.healthchecker is None and isinstance(self.proxymanager, RotatingProxyManager):
+            self.healthchecker = ProxyHealthChecker(self.proxymanager, logger=self.logger)
+            self.healthchecker.start()
+        self.sessionpool.start()
+        self.start_metrics_server()
+        stale = self.load_warm_state()
+        self.curr_proxy, self.session, self.api_client = self.refresh_clients()
+        items = self.collect_existing_ids(stale) if stale else self.seen
         #raise ValueError("Debugging - stop after first search")
         
         self.logger.info("Initial items fetched:" + str(len(items)))
         print(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " - " + "Initial items fetched:" + str(len(items)))
         self.logger.info("----------------------------------------------------")
         print("----------------------------------------------------")
+
+    def select_matching(self, q, items):
+        """Items passing the price limits and filters of at least one of the query's searches."""
+        selected = set()
+        for s in self.queries[q].members:
+            search_params, search_filter = self.search_params_list[s], self.filters[s]
+            for item in items:
+                if (item.id not in selected and item_matches(item, search_params)
+                        and (search_filter is None or search_filter(item))):
+                    selected.add(item.id)
+        return [item for item in items if item.id in selected]
+
+    def handle_response(self, q, data, mark=None):
+        """Parse one page of a query response and notify new items matching one of its searches.
+
+        Every item is checked against the seen store, so an out-of-order
+        (bumped) listing does not hide the new items below it; items at or
+        under the query's high-water mark are never new. Returns (new IDs,
+        newest ID on the page, whether the page was full and its oldest item
+        new, so the next page may hold more new items).
+        """
+        try: 
+            items = parse_catalog(data.content)
+        except Exception as e:
+            self.logger.error(f"Error parsing JSON response: {e}")
+            print(f"Error parsing JSON response: {e}")
+            self.notifier.submit(f"⚠️ JSON parsing error: {e}")
+            return [], None, False
+        if not items:
+            self.logger.info("No items returned from API.", extra={"search": q})
+        if self.capture is not None:
+            drops = self.capture.record(self.queries[q].key, items)
+            if drops and PRICE_DROP_ALERTS:
+                self.notify_price_drops(q, drops)
+
+        new_ids = []
+        fresh = []
+        for item in items:
+            if mark is not None and item.id <= mark:
+                continue
+            if self.seen.add(item.id):
+                new_ids.append(item.id)
+                fresh.append(item)
+        matched = self.select_matching(q, fresh)
+        if len(matched) < len(fresh):
+            self.metrics.filtered.inc((str(q),), len(fresh) - len(matched))
+        if self.dedup is not None and matched:
+            # another shard may have notified the same item already
+            claimed = set(self.dedup.claim([item.id for item in matched]))
+            matched = [item for item in matched if item.id in claimed]
+        for item in matched:
+            self.logger.info("🔔 New item found: %s, URL: %s", item.id, item.url, extra={"search": q, "item": item.id})
+            self.notifier.submit(item.message())
+        self.warmstate.add_seen(new_ids)
+        top_id = max((item.id for item in items), default=None)
+        # page forward while the oldest item of a full page is new, with or without a mark
+        exhausted = (len(items) >= self.queries[q].params.get("per_page", len(items) + 1)
+                     and new_ids[-1:] == [items[-1].id])
+        return new_ids, top_id, exhausted
+
+    def notify_price_drops(self, q, drops):
+        """Alert on seen items that got cheaper and still match one of the query's searches."""
+        previous = {item.id: price for item, price in drops}
+        matched = self.select_matching(q, [item for item, _ in drops])
+        if self.dedup is not None and matched:
+            # another shard may capture the same item and have alerted this drop already
+            claimed = set(self.dedup.claim_price_drops([(item.id, item_price(item)) for item in matched]))
+            matched = [item for item in matched if item.id in claimed]
+        for item in matched:
+            self.logger.info("📉 Price drop: %s, %s -> %s, URL: %s", item.id, previous[item.id], item.price, item.url,
+                             extra={"search": q, "item": item.id})
+            self.notifier.submit(f"📉 Price drop from {previous[item.id]:g} {item.currency}\n{item.message()}")
+
+    def finish_poll(self, q, top_id):
+        """Advance the query's high-water mark and persist its state."""
+        if top_id is not None and top_id > self.high_water.get(q, top_id - 1):
+            self.high_water[q] = top_id
+        self.warmstate.touch_search(self.queries[q].key, top_id)
+        self.warmstate.flush()
+        if (time.time() - self.compact_time) > WARMSTATE_COMPACT_TIME:
+            self.warmstate.compact(SEEN_MAX_AGE or float("inf"), self.seen.capacity)
+            self.compact_time = time.time()
+
+    def fetch(self, search_params):
+        """Fetch one API page, paced by the governor, rotating proxies until one answers.
+
+        A 429 pauses the proxy briefly: short pauses are waited out on the
+        same session, longer ones switch to another proxy. Only a proxy that
+        fails outright is cooled down for PROXY_COOLDOWN.
+        """
         while True:
-            for search_params in self.search_params_list:
-                search_params["time"] = int(time.time())
-                status_code, data = fetch_search(self.api_client, API_URL, params=search_params, tries=TRIES, logger=self.logger)
-                while status_code == -1:
-                    self.logger.info(f"Marking proxy: {self.curr_proxy} as down for assumed {int(self.proxymanager.cooldown / 60)} min.")
-                    self.proxymanager.mark_failed(self.curr_proxy)
-                    self.logger.info("Refreshing clients due to failure")
-                    self.curr_proxy, self.cookie_client, self.api_client = self.refresh_clients()
-                    status_code, data = fetch_search(self.api_client, API_URL, params=search_params, tries=TRIES, logger=self.logger)
-                
-                try: 
-                    data = data.json()
-                except Exception as e:
-                    self.logger.error(f"Error parsing JSON response: {e}")
-                    print(f"Error parsing JSON response: {e}")
-                    notify(self.logger, f"⚠️ JSON parsing error: {e}", self.API_TOKEN, self.USER_KEY)
-                    continue
-                if data.get("items") is None or len(data.get("items")) == 0:
-                    self.logger.info("No items returned from API.")
-
-                for item in data.get("items", []):
-                    item_id = item.get("id")
-                    if item_id not in items:
-                        items.append(item_id)
-                        item_name, item_url, item_price, item_brand, item_size = item.get("title"), item.get("url"), item.get("price"), item.get("brand_title"), item.get("size_title")
-                        self.logger.info(f"🔔 New item found: {item_id}, URL: {item_url}")
-                        message = f"{item_name}\nPrice: {item_price['amount']} {item_price['currency_code']}\nBrand: {item_brand}\nSize: {item_size}\nURL: {item_url}"
-                        notify(self.logger, message, self.API_TOKEN, self.USER_KEY)
-
-                if state.api_call_counter % 50 == 0:
-                    elapsed_string = f"Total API calls made: {state.api_call_counter}, time elapsed: {int((time.time() - self.start_time) / 3600)} hours"
-                    self.logger.info(elapsed_string)
-                    # also print the current time
-                    print(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " - " + elapsed_string, end="\r")
-                current_hour = datetime.datetime.now().hour
-                if current_hour in [11, 17, 23] and not state.status_notification_sent:
-                    elapsed_string = f"Total API calls made: {state.api_call_counter}, time elapsed: {int((time.time() - self.start_time) / 3600)} hours"
-                    notify(self.logger, f"▶️ Vinted Monitor is still running. {elapsed_string}", self.API_TOKEN, self.USER_KEY)
-                    state.status_notification_sent = 1
-                elif current_hour not in [11, 17, 23] and state.status_notification_sent:
-                    state.status_notification_sent = 0
-                if (time.time() - self.newclient_time) > PROXY_ROTATE_TIME:
-                    self.logger.info("Refreshing clients due to time limit.")
-                    self.curr_proxy, self.cookie_client, self.api_client = self.refresh_clients()
-                else:
-                    time.sleep(random_sleeptime())
+            proxy_url, cookie = self.curr_proxy, self.session.cookie
+            wait = self.governor.reserve(proxy_url, cookie)
+            if wait > 0:
+                time.sleep(wait)
+            status_code, data = fetch_search(self.api_client, self.api_url, params=search_params, tries=TRIES, logger=self.logger)
+            if status_code == 200:
+                self.governor.success(proxy_url, cookie)
+                return data
+            if status_code == 429:
+                pause = self.governor.throttled(proxy_url, cookie, retry_after(data))
+                if pause > GOVERNOR_MAX_WAIT:
+                    self.logger.info("Proxy %s throttled for %.0fs, switching proxy", proxy_url, pause,
+                                     extra={"proxy": proxy_url, "status": 429, "pause": pause})
+                    self.proxymanager.penalize(proxy_url, pause)
+                    self.curr_proxy, self.session, self.api_client = self.refresh_clients()
+                continue
+            self.metrics.fetch_failures.inc(("api",))
+            self.logger.info("Marking proxy: %s as down for assumed %d min.", proxy_url, self.proxymanager.cooldown / 60,
+                             extra={"proxy": proxy_url})
+            self.proxymanager.mark_failed(proxy_url)
+            self.logger.info("Refreshing clients due to failure")
+            self.curr_proxy, self.session, self.api_client = self.refresh_clients()
+
+    def fetch_query(self, q, page=1):
+        search_params = {**self.queries[q].params, "time": int(time.time())}
+        if page > 1:
+            search_params["page"] = page
+        return self.fetch(search_params)
+
+    def poll(self, q):
+        """Fetch a query down to its high-water mark, paging forward while whole pages are new."""
+        start = time.time()
+        mark = self.high_water.get(q)
+        new_ids, top_id, exhausted = self.handle_response(q, self.fetch_query(q), mark)
+        page = 1
+        while exhausted and page < MAX_PAGES:
+            page += 1
+            self.logger.info("Query %s: page %d entirely new, fetching page %d", q, page - 1, page, extra={"search": q})
+            more_ids, _, exhausted = self.handle_response(q, self.fetch_query(q, page), mark)
+            new_ids += more_ids
+        self.finish_poll(q, top_id)
+        self.metrics.observe_poll(q, page, len(new_ids), time.time() - start)
+        return new_ids
+
+    def report_status(self):
+        polls = self.metrics.polls.total()
+        if polls % 50 == 0:
+            elapsed_string = f"Total API calls made: {self.metrics.requests.total():.0f}, time elapsed: {int((time.time() - self.start_time) / 3600)} hours"
+            self.logger.info(elapsed_string)
+            self.logger.info(f"Notifier: {self.notifier.stats()}")
+            # also print the current time
+            print(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " - " + elapsed_string, end="\r")
+        if (time.time() - self.summary_time) > METRICS_SUMMARY_INTERVAL:
+            summary = self.metrics.summary()
+            self.logger.info(f"Summary: {summary}")
+            self.notifier.submit(f"▶️ Vinted Monitor is still running. {summary}")
+            self.summary_time = time.time()
+
+    def stop(self):
+        """Make run() return after the current poll."""
+        self._stop.set()
+
+    def close(self):
+        """Stop background threads and release the state database and log files."""
+        self.stop()
+        self.notifier.stop()
+        self.sessionpool.stop()
+        if self.healthchecker is not None:
+            self.healthchecker.stop()
+        if self.catalog is not None:
+            self.catalog.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.api_client is not None:
+            self.api_client.close()
+        self.warmstate.close()
+        if self.capture is not None:
+            self.capture.close()
+        stop_logging(self.logger, self.log_listener)
+
+    def check_reload(self):
+        if self.watcher is None:
+            return
+        search_params_list = self.watcher.poll()
+        if search_params_list is not None:
+            self.reload(search_params_list)
+
+    def reload(self, search_params_list):
+        """Switch to a new search list while running, returns the (added, removed) query ids.
+
+        Queries whose API params did not change keep their id, schedule and
+        high-water mark. A new query whose shape (its params apart from price
+        and paging) was already polled takes over that mark, so only items
+        listed since count as new. Queries of a new shape are seeded straight
+        away, unless the state database has a fresh mark for them, so nothing
+        listed before their first poll is mistaken for existing.
+        """
+        try:
+            filters = compile_filters(search_params_list)
+        except ValueError as e:
+            self.logger.error(f"Not reloading searches: {e}")
+            return set(), set()
+        added_searches, removed_searches = diff_searches(self.search_params_list, search_params_list)
+        old_ids = {query.key: q for q, query in self.queries.items()}
+        old_marks = {query_shape(query.params): self.high_water.get(q) for q, query in self.queries.items()}
+
+        queries, added = {}, set()
+        for query in plan_queries(search_params_list):
+            q = old_ids.get(query.key)
+            if q is None:
+                q = self.next_query
+                self.next_query += 1
+                added.add(q)
+            queries[q] = query
+        removed = set(self.queries) - set(queries)
+
+        for q in added:
+            query = queries[q]
+            high_water, _ = self.warmstate.search_state(query.key)
+            if self.warmstate.is_stale(query.key):
+                high_water = None
+            marks = [mark for mark in (high_water, old_marks.get(query_shape(query.params))) if mark is not None]
+            if marks:
+                self.high_water[q] = max(marks)
+            else:
+                self.unseeded.add(q)
+            self.scheduler.add(q)
+        for q in removed:
+            self.scheduler.remove(q)
+            self.high_water.pop(q, None)
+            self.unseeded.discard(q)
+        self.search_params_list, self.filters, self.queries = search_params_list, filters, queries
+
+        self.logger.info(f"Reloaded searches: {len(added_searches)} added, {len(removed_searches)} removed; "
+                         f"{len(search_params_list)} searches -> {len(queries)} queries, "
+                         f"{len(added)} new ({len(added & self.unseeded)} to seed), {len(removed)} dropped")
+        self.notifier.submit(f"🔄 Searches reloaded: {len(added_searches)} added, {len(removed_searches)} removed, "
+                             f"{len(queries)} queries")
+        self.seed_added(sorted(added & self.unseeded))
+        return added, removed
+
+    def seed_added(self, queries):
+        """Seed queries added by a reload before polling resumes."""
+        for q in queries:
+            self.seed(q)
+
+    def sleep(self, seconds):
+        """Wait until the next poll is due, applying search edits meanwhile. Returns False once stopped."""
+        deadline = time.time() + seconds
+        check = self.watcher.interval if self.watcher is not None else seconds
+        while (remaining := deadline - time.time()) > 0:
+            if self._stop.wait(min(remaining, check)):
+                return False
+            self.check_reload()
+        return not self._stop.is_set()
+
+    def run(self):
+        self.boot()
+        while not self._stop.is_set():
+            self.check_reload()
+            q, wait = self.scheduler.next()
+            if not self.sleep(wait):
+                break
+            if q not in self.queries:
+                continue  # dropped by a reload while waiting
+            new_ids = self.poll(q)
+            self.scheduler.schedule(q, self.scheduler.record(q, len(new_ids)))
+            self.scheduler.pace(self.governor.interval(self.curr_proxy))
+            self.logger.info("Query %s: %s", q, self.scheduler.describe(q), extra={"search": q})
+            self.report_status()
+            if (time.time() - self.newclient_time) > PROXY_ROTATE_TIME:
+                self.logger.info("Refreshing clients due to time limit.")
+                self.curr_proxy, self.session, self.api_client = self.refresh_clients()
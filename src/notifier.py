@@ -1,41 +1,68 @@
 import http.client
+import json
 import logging
+import queue
+import threading
+import time
 import urllib.parse
-from config import NOTIFY_TYPE
+from config import (NOTIFY_TYPE, NOTIFY_HOST, NOTIFY_PORT, NOTIFY_HTTPS,
+                    NOTIFY_MIN_INTERVAL, NOTIFY_DIGEST_THRESHOLD, NOTIFY_DIGEST_MAX,
+                    NOTIFY_RETRIES, NOTIFY_RETRY_DELAY)
 
-def notify(logger, message: str, TOKEN: str, TARGET_ID: str):
+PROVIDERS = {
+    # type: (host, max message length)
+    "pushover": ("api.pushover.net", 1024),
+    "telegram": ("api.telegram.org", 4096),
+}
+
+def build_request(message: str, TOKEN: str, TARGET_ID: str, notify_type: str = NOTIFY_TYPE):
+    """Return (path, body) of the provider's send-message POST."""
+    if notify_type.lower() == "pushover":
+        data = urllib.parse.urlencode({
+            "token": TOKEN,      # Pushover API token
+            "user": TARGET_ID,   # Pushover user key
+            "message": message,
+        }).encode("utf-8")
+        return "/1/messages.json", data
+
+    elif notify_type.lower() == "telegram":
+        data = urllib.parse.urlencode({
+            "chat_id": TARGET_ID,  # Telegram chat ID
+            "text": message
+        })
+        return f"/bot{TOKEN}/sendMessage", data  # Telegram bot token
+
+    raise ValueError("Unknown notification handler type")
+
+def provider_retry_after(response: http.client.HTTPResponse, body: str):
+    """Seconds a provider asks to wait: Telegram's parameters.retry_after or a Retry-After header."""
     try:
-        if NOTIFY_TYPE.lower() == "pushover":
-            data = urllib.parse.urlencode({
-                "token": TOKEN,      # Pushover API token
-                "user": TARGET_ID,   # Pushover user key
-                "message": message,
-            }).encode("utf-8")
-
-            conn = http.client.HTTPSConnection("api.pushover.net", 443)
-            conn.request(
-                "POST",
-                "/1/messages.json",
-                body=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
+        return float(json.loads(body)["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.getheader("Retry-After"))
+    except (TypeError, ValueError):
+        return None
 
-        elif NOTIFY_TYPE.lower() == "telegram":
-            data = urllib.parse.urlencode({
-                "chat_id": TARGET_ID,  # Telegram chat ID
-                "text": message
-            })
-
-            conn = http.client.HTTPSConnection("api.telegram.org")
-            conn.request(
-                "POST",
-                f"/bot{TOKEN}/sendMessage",  # Telegram bot token
-                body=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
+def open_connection(notify_type: str = NOTIFY_TYPE, host=NOTIFY_HOST, port=NOTIFY_PORT, use_https=NOTIFY_HTTPS):
+    if notify_type.lower() not in PROVIDERS:
+        raise ValueError("Unknown notification handler type")
+    host = host or PROVIDERS[notify_type.lower()][0]
+    if use_https:
+        return http.client.HTTPSConnection(host, port or 443)
+    return http.client.HTTPConnection(host, port or 80)
 
-        else:
-            raise ValueError("Unknown notification handler type")
+def notify(logger, message: str, TOKEN: str, TARGET_ID: str):
+    try:
+        path, data = build_request(message, TOKEN, TARGET_ID)
+        conn = open_connection()
+        conn.request(
+            "POST",
+            path,
+            body=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
 
         response = conn.getresponse()
         response_text = response.read().decode()
@@ -55,3 +82,201 @@ def notify(logger, message: str, TOKEN: str, TARGET_ID: str):
     except Exception as e:
         logger.error("Notification error (%s): %s", NOTIFY_TYPE, e)
         #raise e
+
+
+class NotificationDispatcher:
+    """Sends notifications from a background thread over one kept-alive connection.
+
+    submit() only enqueues, so the polling loop never waits on the provider.
+    Sends are spaced by min_interval to respect provider rate limits; when
+    digest_threshold or more messages are waiting they are merged into
+    digest messages up to the provider's length limit. A message the
+    provider throttles (429) or fails on (5xx) is resent up to `retries`
+    times, after the retry_after the provider asks for or a doubling delay.
+    """
+
+    def __init__(self, logger, TOKEN: str, TARGET_ID: str,
+                 notify_type=NOTIFY_TYPE, host=NOTIFY_HOST, port=NOTIFY_PORT,
+                 use_https=NOTIFY_HTTPS, min_interval=NOTIFY_MIN_INTERVAL,
+                 digest_threshold=NOTIFY_DIGEST_THRESHOLD, digest_max=NOTIFY_DIGEST_MAX,
+                 retries=NOTIFY_RETRIES, retry_delay=NOTIFY_RETRY_DELAY):
+        self.logger = logger
+        self.TOKEN = TOKEN
+        self.TARGET_ID = TARGET_ID
+        self.notify_type = notify_type
+        self.host = host
+        self.port = port
+        self.use_https = use_https
+        self.min_interval = min_interval
+        self.digest_threshold = digest_threshold
+        self.digest_max = digest_max
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_length = PROVIDERS[notify_type.lower()][1]
+
+        self.queue = queue.Queue()
+        self.conn = None
+        self._thread = None
+        self._last_send = 0.0
+
+        # metrics
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.digests = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self.max_queue_wait = 0.0
+
+    @property
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "digests": self.digests,
+            "last_latency": self.last_latency,
+            "avg_latency": self.total_latency / self.sent if self.sent else 0.0,
+            "max_latency": self.max_latency,
+            "max_queue_wait": self.max_queue_wait,
+        }
+
+    def submit(self, message: str):
+        self.queue.put((time.time(), message))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="notifier", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Send what is still queued, then stop the worker."""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _loop(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            while len(batch) < self.digest_max:
+                try:
+                    entry = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self.queue.put(None)
+                    break
+                batch.append(entry)
+
+            oldest = batch[0][0]
+            self.max_queue_wait = max(self.max_queue_wait, time.time() - oldest)
+            messages = [message for _, message in batch]
+            if len(messages) >= self.digest_threshold:
+                messages = self.digest(messages)
+                self.digests += len(messages)
+            for message in messages:
+                self._deliver(message)
+
+    def _deliver(self, message: str):
+        """Send one message, resending it while the provider throttles or fails and retries are left.
+
+        Messages queued meanwhile wait, and go out as digests once past the threshold.
+        """
+        for attempt in range(self.retries + 1):
+            self._throttle()
+            try:
+                wait = self._send(message, attempt)
+            except Exception as e:
+                self.failed += 1
+                self.logger.error("Notification error (%s): %s", self.notify_type, e)
+                return
+            if wait is None:
+                return
+            if attempt < self.retries:
+                self.retried += 1
+                self.logger.warning("%s notification retry %d/%d in %.1fs",
+                                    self.notify_type, attempt + 1, self.retries, wait)
+                time.sleep(wait)
+        self.failed += 1
+        self.logger.error("%s notification dropped after %d retries", self.notify_type, self.retries)
+
+    def digest(self, messages):
+        """Pack messages into as few provider-sized digests as possible."""
+        separator = "\n\n"
+        groups, current, size = [], [], 0
+        for message in messages:
+            if current and size + len(separator) + len(message) > self.max_length - 32:
+                groups.append(current)
+                current, size = [], 0
+            size += len(message) + (len(separator) if current else 0)
+            current.append(message)
+        if current:
+            groups.append(current)
+        return [group[0] if len(group) == 1 else f"📦 {len(group)} new items{separator}" + separator.join(group)
+                for group in groups]
+
+    def _throttle(self):
+        wait = self._last_send + self.min_interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_send = time.time()
+
+    def _send(self, message: str, attempt: int = 0):
+        """Send one message, returns seconds to wait before resending it, or None once it is sent or given up."""
+        path, data = build_request(message[:self.max_length], self.TOKEN, self.TARGET_ID, self.notify_type)
+        start = time.time()
+        for reconnect in range(2):
+            try:
+                if self.conn is None:
+                    self.conn = open_connection(self.notify_type, self.host, self.port, self.use_https)
+                self.conn.request(
+                    "POST",
+                    path,
+                    body=data,
+                    headers={"Content-Type": "application/x-www-form-urlencoded"}
+                )
+                response = self.conn.getresponse()
+                response_text = response.read().decode()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                # stale keep-alive connection, reconnect once
+                if self.conn is not None:
+                    self.conn.close()
+                self.conn = None
+                if reconnect == 1:
+                    self.failed += 1
+                    self.logger.error("Notification error (%s): %s", self.notify_type, e)
+                    return
+
+        latency = time.time() - start
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        if response.status == 200:
+            self.sent += 1
+            self.total_latency += latency
+            self.logger.info("%s notification sent successfully! (%.2fs, queue %d)",
+                             self.notify_type, latency, self.queue_depth)
+        elif response.status == 429 or response.status >= 500:
+            self.logger.warning("%s notification refused (%s): %s", self.notify_type, response.status, response_text)
+            wait = provider_retry_after(response, response_text)
+            return wait if wait is not None else self.retry_delay * 2 ** attempt
+        else:
+            self.failed += 1
+            self.logger.error(
+                "%s notification failed (%s): %s",
+                self.notify_type,
+                response.status,
+                response_text
+            )
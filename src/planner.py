@@ -0,0 +1,75 @@
+from typing import Dict, List
+
+from utils import search_key
+
+# Params that can be widened in one API query and re-checked locally per item
+# (`filters` is never sent, see filters.py). Sizes, brands and catalogs
+# cannot: catalog items only carry size_title and brand_title, not the IDs
+# the search filters on.
+PRICE_FROM = "price_from"
+PRICE_TO = "price_to"
+LOCAL_PARAMS = {PRICE_FROM, PRICE_TO, "per_page", "time", "filters"}
+
+
+class PlannedQuery:
+    """One API query covering one or more configured searches."""
+
+    __slots__ = ("params", "members", "key")
+
+    def __init__(self, params: Dict, members: List[int]):
+        self.params = params
+        self.members = members  # indices into search_params_list
+        self.key = search_key(params)
+
+    def __repr__(self):
+        return f"PlannedQuery(members={self.members}, params={self.params})"
+
+
+def item_price(item):
+    try:
+        return float(item.price)
+    except (TypeError, ValueError):
+        return None
+
+
+def item_matches(item, search_params: Dict) -> bool:
+    """Re-apply the filters a merged query widened to one original search."""
+    price_from, price_to = search_params.get(PRICE_FROM), search_params.get(PRICE_TO)
+    if price_from is None and price_to is None:
+        return True
+    price = item_price(item)
+    if price is None:
+        return True
+    if price_from is not None and price < float(price_from):
+        return False
+    if price_to is not None and price > float(price_to):
+        return False
+    return True
+
+
+def query_shape(search_params: Dict) -> str:
+    """Key of the params a merged query keeps as they are; searches of one shape share a query."""
+    return search_key({k: v for k, v in search_params.items() if k not in LOCAL_PARAMS})
+
+
+def merge_params(group: List[Dict]) -> Dict:
+    merged = {k: v for k, v in group[0].items() if k not in LOCAL_PARAMS}
+    price_to = [p.get(PRICE_TO) for p in group]
+    if all(v is not None for v in price_to):
+        merged[PRICE_TO] = max(price_to, key=float)
+    price_from = [p.get(PRICE_FROM) for p in group]
+    if all(v is not None for v in price_from):
+        merged[PRICE_FROM] = min(price_from, key=float)
+    per_page = [p["per_page"] for p in group if "per_page" in p]
+    if per_page:
+        merged["per_page"] = max(per_page)
+    return merged
+
+
+def plan_queries(search_params_list: List[Dict]) -> List[PlannedQuery]:
+    """Group searches differing only in price limits into one superset query each."""
+    groups = {}
+    for s, search_params in enumerate(search_params_list):
+        groups.setdefault(query_shape(search_params), []).append(s)
+    return [PlannedQuery(merge_params([search_params_list[s] for s in members]), members)
+            for members in groups.values()]
@@ -1,34 +1,197 @@
+import heapq
 import logging
+import threading
 import time
-from itertools import cycle
-from config import PROXY_COOLDOWN
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import httpx
+
+from config import (PROXY_COOLDOWN, TIMEOUT, PROXY_SCORE_ALPHA, PROXY_HANDOUT_PENALTY,
+                    PROXY_CHECK_URL, PROXY_CHECK_INTERVAL,
+                    PROXY_CHECK_TIMEOUT, PROXY_CHECK_WORKERS)
+
+
+class ProxyStats:
+    __slots__ = ("latency", "success", "samples", "handouts", "turn", "last_ok")
+
+    def __init__(self, latency=TIMEOUT / 4, success=1.0):
+        self.latency = latency  # rolling mean seconds
+        self.success = success  # rolling success rate, 0..1
+        self.samples = 0
+        self.handouts = 0
+        self.turn = 0.0  # virtual time of its last handout, see RotatingProxyManager
+        self.last_ok = None  # time of the last successful request or probe
+
+    def update(self, latency, ok, alpha=PROXY_SCORE_ALPHA):
+        if latency is not None:
+            self.latency += alpha * (latency - self.latency)
+        self.success += alpha * ((1.0 if ok else 0.0) - self.success)
+        self.samples += 1
+        if ok:
+            self.last_ok = time.time()
+
+    @property
+    def score(self):
+        """Expected seconds per successful request, lower is better."""
+        return self.latency / max(self.success, 0.05)
+
 
 class RotatingProxyManager:
+    """Hands out the best-scoring live proxy.
+
+    Proxies sit in a heap keyed on (turn + score + handout penalty, handout
+    order); stale entries are skipped lazily. A handout moves the pool's
+    virtual clock to the proxy's key and makes that its new turn, so each
+    proxy's share of the traffic stays inversely proportional to its score
+    plus PROXY_HANDOUT_PENALTY: good proxies keep getting most of it, however
+    long the pool runs, while rotation still spreads load. Proxies that join
+    later, or come back from a cooldown, start at the clock rather than
+    catching up on the handouts they missed.
+    """
+
     def __init__(self, proxies, cooldown=PROXY_COOLDOWN):
         self.proxies = proxies
         self.cooldown = cooldown
-        self.proxy_cycle = cycle(proxies)
-        self.failed = {} 
+        self.failed = {}
+        self.stats = {proxy: ProxyStats() for proxy in proxies}
+        self._heap = []
+        self._entry = {}  # proxy -> seq of its valid heap entry
+        self._seq = count()
+        self._clock = 0.0  # key of the latest handout
+        self._lock = threading.Lock()
+        for proxy in proxies:
+            self._push(proxy)
         # dead initialisation
         #for proxy in proxies:
-        #    self.failed[proxy] = time.time() - self.cooldown * 10 # 
+        #    self.failed[proxy] = time.time() - self.cooldown * 10 #
 
+    def _push(self, proxy):
+        seq = next(self._seq)
+        self._entry[proxy] = seq
+        stats = self.stats[proxy]
+        heapq.heappush(self._heap, (stats.turn + stats.score + PROXY_HANDOUT_PENALTY, seq, proxy))
+        if len(self._heap) > 4 * len(self._entry):
+            self._heap = [e for e in self._heap if self._entry.get(e[2]) == e[1]]
+            heapq.heapify(self._heap)
 
     def _is_alive(self, proxy):
         if proxy not in self.failed:
             return True
         return time.time() >= self.failed[proxy]
 
-    def get_next_proxy(self):
-        for _ in range(len(self.proxies)):
-            proxy = next(self.proxy_cycle)
-            if self._is_alive(proxy):
-                return proxy
-                #return {
-                #    "http://": proxy,
-                #    "https://": proxy,
-                #}
+    def get_next_proxy(self, exclude=()):
+        """Hand out the best live proxy not in `exclude`."""
+        with self._lock:
+            cooling = []
+            try:
+                while self._heap:
+                    key, seq, proxy = heapq.heappop(self._heap)
+                    if self._entry.get(proxy) != seq:
+                        continue
+                    if self._is_alive(proxy) and proxy not in exclude:
+                        self._clock = max(self._clock, key)
+                        self.stats[proxy].handouts += 1
+                        self.stats[proxy].turn = self._clock
+                        self._push(proxy)
+                        return proxy
+                        #return {
+                        #    "http://": proxy,
+                        #    "https://": proxy,
+                        #}
+                    cooling.append(proxy)
+            finally:
+                for proxy in cooling:
+                    self._push(proxy)
         raise RuntimeError("All proxies are in cooldown — no proxy available")
 
+    def add(self, proxies):
+        """Put newly found proxies into rotation."""
+        with self._lock:
+            for proxy in proxies:
+                if proxy not in self.stats:
+                    self.proxies.append(proxy)
+                    self.stats[proxy] = ProxyStats()
+                    self.stats[proxy].turn = self._clock
+                    self._push(proxy)
+
+    def restore(self, scores):
+        """Seed rolling stats from a previous run, {proxy: (latency, success)}."""
+        with self._lock:
+            for proxy, (latency, success) in scores.items():
+                if proxy in self.stats:
+                    self.stats[proxy].latency = latency
+                    self.stats[proxy].success = success
+                    self.stats[proxy].turn = max(self.stats[proxy].turn, self._clock)
+                    self._push(proxy)
+
+    def record(self, proxy, latency, ok):
+        """Feed one observed request (latency in seconds, None if unknown) into the proxy's score."""
+        if proxy not in self.stats:
+            return
+        with self._lock:
+            self.stats[proxy].update(latency, ok)
+            self._push(proxy)
+
     def mark_failed(self, proxy):
         self.failed[proxy] = time.time() + self.cooldown
+        self.record(proxy, None, False)
+
+    def penalize(self, proxy, seconds):
+        """Take a throttled proxy out of rotation for a short pause, without the failure cooldown."""
+        self.failed[proxy] = max(self.failed.get(proxy, 0), time.time() + seconds)
+
+
+class ProxyHealthChecker:
+    """Background thread probing every proxy so bad ones are cooled down
+    before the polling loop picks them."""
+
+    def __init__(self, manager: RotatingProxyManager, url=PROXY_CHECK_URL,
+                 interval=PROXY_CHECK_INTERVAL, timeout=PROXY_CHECK_TIMEOUT,
+                 workers=PROXY_CHECK_WORKERS, logger=None):
+        self.manager = manager
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.workers = workers
+        self.logger = logger or logging.getLogger(__name__)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def probe(self, proxy):
+        start = time.time()
+        try:
+            with httpx.Client(proxy=proxy, timeout=self.timeout) as client:
+                ok = client.get(self.url).status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latency = time.time() - start
+        if ok:
+            self.manager.record(proxy, latency, True)
+        else:
+            self.manager.mark_failed(proxy)
+        return ok
+
+    def check_all(self):
+        proxies = [proxy for proxy in self.manager.proxies
+                   if proxy is not None and self.manager._is_alive(proxy)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self.probe, proxies))
+        self.logger.info(f"Proxy health check: {sum(results)}/{len(results)} alive")
+        return results
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.check_all()
+            except Exception:
+                self.logger.exception("Proxy health check failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="proxy-health", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,46 @@
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # optional speed-up
+    import json
+    _loads = json.loads
+
+
+class ItemRecord:
+    """The fields of a catalog item the monitor actually uses."""
+
+    __slots__ = ("id", "title", "url", "price", "currency", "brand", "size", "seller")
+
+    def __init__(self, id, title, url, price, currency, brand, size, seller=None):
+        self.id = id
+        self.title = title
+        self.url = url
+        self.price = price  # amount as sent by the API, e.g. "12.5"
+        self.currency = currency
+        self.brand = brand
+        self.size = size
+        self.seller = seller  # login of the user selling the item
+
+    @classmethod
+    def from_item(cls, item):
+        price = item.get("price") or {}
+        return cls(item.get("id"), item.get("title"), item.get("url"),
+                   price.get("amount"), price.get("currency_code"),
+                   item.get("brand_title"), item.get("size_title"),
+                   (item.get("user") or {}).get("login"))
+
+    def message(self):
+        return f"{self.title}\nPrice: {self.price} {self.currency}\nBrand: {self.brand}\nSize: {self.size}\nURL: {self.url}"
+
+    def __repr__(self):
+        return f"ItemRecord(id={self.id}, title={self.title!r}, price={self.price} {self.currency})"
+
+
+def parse_catalog(content: bytes):
+    """Decode a /api/v2/catalog/items body straight into ItemRecords.
+
+    Uses orjson when installed; raises ValueError on malformed JSON.
+    """
+    items = _loads(content).get("items") or []
+    from_item = ItemRecord.from_item
+    return [from_item(item) for item in items]
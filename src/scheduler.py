@@ -0,0 +1,139 @@
+import datetime
+import heapq
+import random
+import time
+
+from config import (SLEEPTIME_MIN, SLEEPTIME_MAX,
+                    SCHED_MIN_INTERVAL, SCHED_MAX_INTERVAL, SCHED_TARGET_NEW,
+                    SCHED_BUDGET_PER_MIN, SCHED_ALPHA, SCHED_JITTER, SCHED_PRIOR_RATE, SCHED_MIN_RATE)
+
+
+class ArrivalRate:
+    """New-item arrival rate (items/s) as a moving average per hour of the day."""
+
+    __slots__ = ("buckets", "last_poll")
+
+    def __init__(self):
+        self.buckets = [None] * 24
+        self.last_poll = None
+
+    def update(self, new_count, now, alpha=SCHED_ALPHA, prior=SCHED_PRIOR_RATE, floor=SCHED_MIN_RATE):
+        if self.last_poll is not None and now > self.last_poll:
+            sample = new_count / (now - self.last_poll)
+            hour = datetime.datetime.fromtimestamp(now).hour
+            # an hour seen for the first time starts from the other hours (or the prior), so one
+            # empty poll cannot zero it
+            current = self.estimate(now)
+            if current is None:
+                current = prior
+            self.buckets[hour] = max(floor, current + alpha * (sample - current))
+        self.last_poll = now
+
+    def estimate(self, now):
+        current = self.buckets[datetime.datetime.fromtimestamp(now).hour]
+        if current is not None:
+            return current
+        known = [b for b in self.buckets if b is not None]
+        return sum(known) / len(known) if known else None
+
+
+class PollScheduler:
+    """Decides which query to poll next and when.
+
+    Each query is polled roughly every target_new / rate seconds, clamped to
+    [min_interval, max_interval], so busy queries are polled often and quiet
+    ones rarely. Due times sit in a heap; dispatches are additionally spaced
+    to stay under budget_per_min requests per proxy. A dispatch slot no query
+    is due for goes to the query left longest unpolled, so spare budget is
+    spent on the quiet queries. Queries are identified by id and can be added
+    and removed while running.
+    """
+
+    def __init__(self, queries, min_interval=SCHED_MIN_INTERVAL, max_interval=SCHED_MAX_INTERVAL,
+                 target_new=SCHED_TARGET_NEW, budget_per_min=SCHED_BUDGET_PER_MIN, jitter=SCHED_JITTER):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new = target_new
+        self.budget_spacing = 60 / budget_per_min
+        self.spacing = self.budget_spacing
+        self.jitter = jitter
+        self.rates = {}  # query id -> ArrivalRate
+        self.intervals = {}  # query id -> seconds
+        self.due = {}  # query id -> due time of its live heap entry
+        self.last_dispatch = 0.0
+        self._heap = []
+        now = time.time()
+        for q in queries:
+            self.add(q, now)
+
+    def add(self, q, now=None):
+        """Start scheduling a query, due straight away."""
+        now = time.time() if now is None else now
+        self.rates[q] = ArrivalRate()
+        self.intervals[q] = (SLEEPTIME_MIN + SLEEPTIME_MAX) / 2
+        self.schedule(q, 0, now)
+
+    def remove(self, q):
+        """Stop scheduling a query; its pending heap entry is skipped by next()."""
+        self.rates.pop(q, None)
+        self.intervals.pop(q, None)
+        self.due.pop(q, None)
+
+    def interval(self, q, now=None):
+        now = time.time() if now is None else now
+        rate = self.rates[q].estimate(now)
+        if rate is None:
+            return self.intervals[q]
+        return min(self.max_interval, max(self.min_interval, self.target_new / rate))
+
+    def expected_delay(self, q):
+        """Mean time from an item being listed to the next poll of its query."""
+        return self.intervals[q] / 2
+
+    def record(self, q, new_count, now=None):
+        """Feed the result of a poll, returns the (jittered) delay until the query is due again."""
+        now = time.time() if now is None else now
+        self.rates[q].update(new_count, now)
+        self.intervals[q] = self.interval(q, now)
+        return self.intervals[q] * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def pace(self, interval):
+        """Space dispatches by the proxy's current pace, never closer than budget_per_min allows."""
+        self.spacing = max(interval, self.budget_spacing)
+
+    def schedule(self, q, delay, now=None):
+        now = time.time() if now is None else now
+        self.due[q] = now + delay
+        heapq.heappush(self._heap, (now + delay, q))
+
+    def next(self, now=None):
+        """Pop the next due query, returns (query index, seconds to wait before polling it)."""
+        now = time.time() if now is None else now
+        due, q = heapq.heappop(self._heap)
+        while self.due.get(q) != due:  # removed, or moved by spare()
+            due, q = heapq.heappop(self._heap)
+        start = max(self.last_dispatch + self.spacing, now)
+        if due > start:
+            spare = self.spare(start)
+            if spare is None:
+                start = due
+            else:
+                heapq.heappush(self._heap, (due, q))
+                q = spare
+        del self.due[q]
+        self.last_dispatch = start
+        return q, start - now
+
+    def spare(self, start):
+        """The query unpolled the longest, if it may be polled at `start` already."""
+        q = min(self.rates, key=lambda q: self.rates[q].last_poll or 0.0)
+        last_poll = self.rates[q].last_poll
+        if last_poll is not None and start - last_poll < self.min_interval:
+            return None
+        return q
+
+    def describe(self, q):
+        rate = self.rates[q].estimate(time.time())
+        rate_str = f"{rate * 3600:.1f}/h" if rate is not None else "unknown"
+        return (f"rate {rate_str}, interval {self.intervals[q]:.0f}s, "
+                f"expected detection delay {self.expected_delay(q):.0f}s")
@@ -0,0 +1,74 @@
+import time
+from array import array
+from typing import Iterable, Optional
+
+from config import SEEN_MAX_ITEMS, SEEN_MAX_AGE
+
+
+class SeenStore:
+    """Bounded set of seen item IDs.
+
+    Membership goes through a set, insertion order is kept in a fixed-size
+    ring of int64 IDs (plus their insertion times) so the oldest entries can
+    be evicted by count or by age without the store growing forever.
+    """
+
+    def __init__(self, capacity: int = SEEN_MAX_ITEMS, max_age: Optional[float] = SEEN_MAX_AGE):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.max_age = max_age
+        self._ids = array("q", bytes(8 * capacity))
+        self._times = array("d", bytes(8 * capacity))
+        self._index = set()
+        self._head = 0  # slot of the oldest entry
+        self._size = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, item_id):
+        return item_id in self._index
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._ids[(self._head + i) % self.capacity]
+
+    def add(self, item_id: int, now: Optional[float] = None) -> bool:
+        """Add an ID, returns False if it was already present."""
+        if item_id in self._index:
+            return False
+        now = time.time() if now is None else now
+        if self._size == self.capacity:
+            self._evict_oldest()
+        slot = (self._head + self._size) % self.capacity
+        self._ids[slot] = item_id
+        self._times[slot] = now
+        self._index.add(item_id)
+        self._size += 1
+        if self.max_age is not None:
+            self.expire(now)
+        return True
+
+    def update(self, item_ids: Iterable[int], now: Optional[float] = None) -> int:
+        """Add many IDs, returns how many were new."""
+        now = time.time() if now is None else now
+        return sum(self.add(item_id, now) for item_id in item_ids)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop entries older than max_age, returns how many were dropped."""
+        if self.max_age is None:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.max_age
+        dropped = 0
+        while self._size and self._times[self._head] < cutoff:
+            self._evict_oldest()
+            dropped += 1
+        return dropped
+
+    def _evict_oldest(self):
+        self._index.discard(self._ids[self._head])
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
+        self.evicted += 1
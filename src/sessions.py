@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+
+from utils import create_cookie_client, get_random_user_agent, fetch_cookies
+from config import (BASE_URL, SESSION_COOKIE_NAME, TRIES,
+                    SESSION_POOL_SIZE, SESSION_MAX_AGE, SESSION_REFILL_CHECK)
+
+
+class Session:
+    """A proxy with a user agent and the session cookie it was issued."""
+
+    __slots__ = ("proxy_url", "user_agent", "cookie", "created")
+
+    def __init__(self, proxy_url, user_agent, cookie, created=None):
+        self.proxy_url = proxy_url
+        self.user_agent = user_agent
+        self.cookie = cookie
+        self.created = time.time() if created is None else created
+
+    def age(self, now=None):
+        return (time.time() if now is None else now) - self.created
+
+
+class SessionPool:
+    """Keeps `size` ready sessions so rotating proxies is a constant-time swap.
+
+    A background thread fetches cookies ahead of demand; acquire() only
+    builds a session itself (a miss) when the pool has run dry. Sessions
+    older than max_age or whose proxy went into cooldown are discarded.
+    """
+
+    def __init__(self, proxymanager, size=SESSION_POOL_SIZE, max_age=SESSION_MAX_AGE,
+                 base_url=BASE_URL, hooks=None, metrics=None, logger=None):
+        self.proxymanager = proxymanager
+        self.size = size
+        self.max_age = max_age
+        self.base_url = base_url
+        self.hooks = hooks  # proxy_url -> (request_hooks, response_hooks)
+        self.metrics = metrics
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.ready = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_time = 0.0
+        self.expired = 0
+
+    def stats(self):
+        return {
+            "ready": len(self.ready),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refills": self.refills,
+            "avg_refill_time": self.refill_time / self.refills if self.refills else 0.0,
+            "expired": self.expired,
+        }
+
+    def build(self, exclude=()):
+        """Fetch a cookie through the next live proxy, cooling down proxies that fail."""
+        while True:
+            proxy_url = self.proxymanager.get_next_proxy()
+            for _ in range(len(self.proxymanager.proxies)):
+                if proxy_url not in exclude:
+                    break
+                proxy_url = self.proxymanager.get_next_proxy()
+            user_agent = get_random_user_agent()
+            request_hooks, response_hooks = self.hooks(proxy_url) if self.hooks else (None, None)
+            with create_cookie_client(user_agent, proxy_url,
+                                      request_hooks=request_hooks,
+                                      response_hooks=response_hooks) as cookie_client:
+                session_cookie = fetch_cookies(cookie_client, self.base_url, SESSION_COOKIE_NAME, tries=TRIES, logger=self.logger)
+            if session_cookie != -1:
+                return Session(proxy_url, user_agent, session_cookie)
+            if self.metrics is not None:
+                self.metrics.fetch_failures.inc(("cookie",))
+            self.logger.info(f"Marking proxy: {proxy_url} as down for assumed {int(self.proxymanager.cooldown / 60)} min.")
+            self.proxymanager.mark_failed(proxy_url)
+
+    def _usable(self, session, now):
+        return session.age(now) < self.max_age and self.proxymanager._is_alive(session.proxy_url)
+
+    def acquire(self, exclude=()):
+        """Take a ready session whose proxy is not in `exclude`, building one if none is ready."""
+        now = time.time()
+        with self._lock:
+            for i, session in enumerate(self.ready):
+                if session.proxy_url not in exclude and self._usable(session, now):
+                    del self.ready[i]
+                    self.hits += 1
+                    break
+            else:
+                session = None
+        self._wakeup.set()
+        if session is not None:
+            return session
+        self.misses += 1
+        return self.build(exclude)
+
+    def _prune(self):
+        now = time.time()
+        with self._lock:
+            keep = [session for session in self.ready if self._usable(session, now)]
+            self.expired += len(self.ready) - len(keep)
+            self.ready = keep
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._prune()
+            while len(self.ready) < self.size and not self._stop.is_set():
+                start = time.time()
+                try:
+                    in_pool = {session.proxy_url for session in self.ready}
+                    session = self.build(exclude=in_pool)
+                except RuntimeError as e:  # every proxy cooling down
+                    self.logger.info(f"Session pool refill paused: {e}")
+                    break
+                except Exception:
+                    self.logger.exception("Session pool refill failed")
+                    break
+                with self._lock:
+                    self.ready.append(session)
+                self.refills += 1
+                self.refill_time += time.time() - start
+            self._wakeup.wait(SESSION_REFILL_CHECK)
+            self._wakeup.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="session-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
@@ -1,2 +0,0 @@
-api_call_counter = 0
-status_notification_sent = 0
\ No newline at end of file
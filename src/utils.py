@@ -1,19 +1,24 @@
+import asyncio
+import functools
+import hashlib
 import httpx
+import importlib.util
+import json
 import logging
 import random
 import time
+from email.utils import parsedate_to_datetime
 from typing import Dict, Optional
-import yaml
-from bs4 import BeautifulSoup
 
 from config import (UA_LIST, BASE_HEADERS, 
                          SESSION_COOKIE_NAME, SLEEPTIME_MIN, 
-                         SLEEPTIME_MAX, SLEEPTIME_LONG,
-                         TIMEOUT)
-import state
+                         SLEEPTIME_MAX,
+                         TIMEOUT, HTTP2, HTTP_MAX_CONNECTIONS,
+                         HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY)
 
 def load_yaml(path: str):
     """Load a YAML file and return the parsed Python object."""
+    import yaml  # only needed when loading config
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)    
 
@@ -24,61 +29,129 @@ def load_txt_lines(path: str):
     lines = [f"http://{line}" if not line.startswith("http") else line for line in lines]
     return lines
 
-def scrape_and_save_proxies():
+def scrape_proxies():
+    """Scrape host:port entries from free-proxy-list.net."""
+    from bs4 import BeautifulSoup  # heavy, only needed when scraping
     html = httpx.get("https://free-proxy-list.net/en/anonymous-proxy.html").text
     soup = BeautifulSoup(html, "html.parser")
 
-    proxies = [
+    return [
         f"{cols[0].text.strip()}:{cols[1].text.strip()}"
         for row in soup.select("div.table-responsive.fpl-list tbody tr")
         if (cols := row.find_all("td")) and len(cols) >= 2
     ]
-    with open("proxy_list.txt", "w", encoding="utf-8") as f:
-        for proxy in proxies:
-            f.write(f"{proxy}\n")
+
+def cookie_headers(user_agent):
+    return {
+        **BASE_HEADERS,
+        "User-Agent": user_agent,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        #"Sec-Fetch-Site": "none",
+        #"Sec-Fetch-Mode": "navigate",
+        #"Sec-Fetch-Dest": "document",
+    }
+
+def api_headers(user_agent, session_cookie):
+    return {
+        **BASE_HEADERS,
+        "User-Agent": user_agent,
+        "Accept": "application/json, text/plain, */*",
+        "Cookie": f"{SESSION_COOKIE_NAME}={session_cookie}",
+        #"Connection": "keep-alive",
+        #"Sec-Fetch-Site": "same-origin",
+        #"Sec-Fetch-Mode": "cors",
+        #"Sec-Fetch-Dest": "empty",
+    }
+
+@functools.lru_cache(maxsize=None)
+def h2_available():
+    return importlib.util.find_spec("h2") is not None
+
+def client_options(http2=HTTP2, prior_knowledge=False):
+    """Transport settings shared by every client.
+
+    HTTP/2 is negotiated per connection, so servers and proxies without it
+    keep using HTTP/1.1. `prior_knowledge` speaks HTTP/2 straight away over
+    plain http instead, for direct connections to servers that expect it.
+    """
+    if http2 and not h2_available():
+        logging.getLogger(__name__).warning("HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        http2 = False
+    return {
+        "http1": not (http2 and prior_knowledge),
+        "http2": http2,
+        "limits": httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                               max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                               keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+    }
 
 def create_cookie_client(user_agent, proxy_url=None, 
-                         request_hooks=None, response_hooks=None):
+                         request_hooks=None, response_hooks=None, **options):
     return httpx.Client(
-        headers={
-            **BASE_HEADERS,
-            "User-Agent": user_agent,
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            #"Sec-Fetch-Site": "none",
-            #"Sec-Fetch-Mode": "navigate",
-            #"Sec-Fetch-Dest": "document",
-        },
+        headers=cookie_headers(user_agent),
         proxy=proxy_url,
         timeout=TIMEOUT,
         follow_redirects=True,
         event_hooks={
             "request": request_hooks or [],
             "response": response_hooks or []
-    }
+    },
+        **client_options(**options)
     )
 
 def create_api_client(user_agent, proxy_url, session_cookie,
-                      request_hooks=None, response_hooks=None):
+                      request_hooks=None, response_hooks=None, **options):
     return httpx.Client(
-        headers={
-            **BASE_HEADERS,
-            "User-Agent": user_agent,
-            "Accept": "application/json, text/plain, */*",
-            "Cookie": f"{SESSION_COOKIE_NAME}={session_cookie}",
-            #"Connection": "keep-alive",
-            #"Sec-Fetch-Site": "same-origin",
-            #"Sec-Fetch-Mode": "cors",
-            #"Sec-Fetch-Dest": "empty",
-        }, 
+        headers=api_headers(user_agent, session_cookie), 
         proxy=proxy_url,
         timeout=TIMEOUT,
         follow_redirects=True,
         event_hooks={
             "request": request_hooks or [],
             "response": response_hooks or []
-    }
+    },
+        **client_options(**options)
+    )
+
+def create_async_cookie_client(user_agent, proxy_url=None,
+                               request_hooks=None, response_hooks=None, **options):
+    """Async twin of create_cookie_client, hooks must be coroutine functions."""
+    return httpx.AsyncClient(
+        headers=cookie_headers(user_agent),
+        proxy=proxy_url,
+        timeout=TIMEOUT,
+        follow_redirects=True,
+        event_hooks={
+            "request": request_hooks or [],
+            "response": response_hooks or []
+    },
+        **client_options(**options)
     )
 
+def create_async_api_client(user_agent, proxy_url, session_cookie,
+                            request_hooks=None, response_hooks=None, **options):
+    """Async twin of create_api_client, hooks must be coroutine functions."""
+    return httpx.AsyncClient(
+        headers=api_headers(user_agent, session_cookie),
+        proxy=proxy_url,
+        timeout=TIMEOUT,
+        follow_redirects=True,
+        event_hooks={
+            "request": request_hooks or [],
+            "response": response_hooks or []
+    },
+        **client_options(**options)
+    )
+
+
+def search_key(search_params: Dict) -> str:
+    """Stable hash of a search config, ignoring the per-request 'time' param."""
+    canonical = {k: v for k, v in search_params.items() if k != "time"}
+    for k, v in canonical.items():
+        if isinstance(v, list):
+            canonical[k] = sorted(v, key=str)
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
 
 def get_random_user_agent() -> str:
     return random.choice(UA_LIST)["ua"]
@@ -90,7 +163,6 @@ def fetch_cookies(client: httpx.Client, url: str, cookie_name: str, tries: int,
     for attempt in range(tries):
         try:
             response = client.get(url)
-            state.api_call_counter += 1
             cookie = response.cookies.get(cookie_name)
             if cookie is not None:
                 return cookie
@@ -106,19 +178,32 @@ def fetch_cookies(client: httpx.Client, url: str, cookie_name: str, tries: int,
     logger.info(f"Failed to retrieve cookie '{cookie_name}' after {tries} tries.")
     return -1
 
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header (delta or HTTP date), None if absent or unparsable."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 def fetch_search(client: httpx.Client, url: str, params: Optional[Dict], tries: int, logger):
+    """(200, response), (429, response) when throttled, or (-1, None) after `tries` failures."""
     for attempt in range(tries):
         try:
             response = client.get(url, params=params)
-            state.api_call_counter += 1
             if response.status_code == 200:
                 return response.status_code, response
-            #elif response.status_code == 429:
-            #    logger.info("429; Too Many Requests -> Sleeping...")
-            #    time.sleep(SLEEPTIME_LONG)
-            #    return response.status_code, response
+            elif response.status_code == 429:
+                logger.info("429; Too Many Requests")
+                return response.status_code, response
             else:
-                logger.info(str(response.status_code) + " during API call")
+                logger.info("%s during API call", response.status_code)
         except httpx.TimeoutException:
             logger.info("Timeout during API call")
         except httpx.RequestError as e:
@@ -128,6 +213,47 @@ def fetch_search(client: httpx.Client, url: str, params: Optional[Dict], tries:
     logger.info(f"Failed to fetch search after {tries} tries.")
     return -1, None
 
+async def fetch_cookies_async(client: httpx.AsyncClient, url: str, cookie_name: str, tries: int, logger) -> str:
+    """Same contract as fetch_cookies: the cookie value, or -1 on failure."""
+    for attempt in range(tries):
+        try:
+            response = await client.get(url)
+            cookie = response.cookies.get(cookie_name)
+            if cookie is not None:
+                return cookie
+            else:
+                logger.info(f"Cookie '{cookie_name}' not found in response.")
+        except httpx.TimeoutException as e:
+            logger.info(f"Timeout during cookie fetch attempt: {e}")
+        except httpx.RequestError as e:
+            logger.info(f"RequestError during cookie fetch attempt: {e}")
+
+        if attempt < tries - 1:
+            await asyncio.sleep(random_sleeptime() * (1 + attempt))
+    logger.info(f"Failed to retrieve cookie '{cookie_name}' after {tries} tries.")
+    return -1
+
+async def fetch_search_async(client: httpx.AsyncClient, url: str, params: Optional[Dict], tries: int, logger):
+    """Same contract as fetch_search: (200, response), (429, response) or (-1, None) on failure."""
+    for attempt in range(tries):
+        try:
+            response = await client.get(url, params=params)
+            if response.status_code == 200:
+                return response.status_code, response
+            elif response.status_code == 429:
+                logger.info("429; Too Many Requests")
+                return response.status_code, response
+            else:
+                logger.info("%s during API call", response.status_code)
+        except httpx.TimeoutException:
+            logger.info("Timeout during API call")
+        except httpx.RequestError as e:
+            logger.info(f"RequestError during API call: {e}")
+        if attempt < tries - 1:
+            await asyncio.sleep(random_sleeptime())
+    logger.info(f"Failed to fetch search after {tries} tries.")
+    return -1, None
+
 def get_iteminfo(html: str):
     items = None
     return items
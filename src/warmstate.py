@@ -0,0 +1,110 @@
+import sqlite3
+import time
+from typing import Iterable, Optional, Tuple
+
+from config import STATE_DB, WARMSTATE_STALE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    id INTEGER PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seen_by_time ON seen (seen_at);
+CREATE TABLE IF NOT EXISTS searches (
+    key TEXT PRIMARY KEY,
+    high_water INTEGER,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class WarmState:
+    """On-disk copy of the seen-ID set and per-search high-water marks.
+
+    Lets a restarted monitor resume polling straight away instead of
+    re-seeding every search with collect_existing_ids.
+    """
+
+    def __init__(self, path: str = STATE_DB, stale_after: float = WARMSTATE_STALE):
+        self.path = path
+        self.stale_after = stale_after
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._pending_seen = []
+        self._pending_searches = {}
+
+    def load_seen(self, store, max_age: Optional[float] = None) -> int:
+        """Fill a SeenStore with the newest persisted IDs, oldest first."""
+        cutoff = time.time() - max_age if max_age is not None else 0
+        rows = self.conn.execute(
+            "SELECT id, seen_at FROM ("
+            "  SELECT id, seen_at FROM seen WHERE seen_at >= ? ORDER BY seen_at DESC LIMIT ?"
+            ") ORDER BY seen_at ASC",
+            (cutoff, store.capacity),
+        ).fetchall()
+        for item_id, seen_at in rows:
+            store.add(item_id, now=seen_at)
+        return len(rows)
+
+    def add_seen(self, item_ids: Iterable[int], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self._pending_seen.extend((item_id, now) for item_id in item_ids)
+
+    def touch_search(self, key: str, high_water: Optional[int], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        previous = self._pending_searches.get(key)
+        if high_water is None and previous is not None:
+            high_water = previous[0]
+        self._pending_searches[key] = (high_water, now)
+
+    def search_state(self, key: str) -> Tuple[Optional[int], Optional[float]]:
+        """Return (high_water, updated_at) for a search, (None, None) if unknown."""
+        if key in self._pending_searches:
+            return self._pending_searches[key]
+        row = self.conn.execute(
+            "SELECT high_water, updated_at FROM searches WHERE key = ?", (key,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def is_stale(self, key: str, now: Optional[float] = None) -> bool:
+        _, updated_at = self.search_state(key)
+        if updated_at is None:
+            return True
+        now = time.time() if now is None else now
+        return now - updated_at > self.stale_after
+
+    def flush(self):
+        """Write buffered updates in a single transaction."""
+        if not self._pending_seen and not self._pending_searches:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen (id, seen_at) VALUES (?, ?)", self._pending_seen
+            )
+            self.conn.executemany(
+                "INSERT INTO searches (key, high_water, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "high_water = COALESCE(MAX(excluded.high_water, searches.high_water), excluded.high_water, searches.high_water), "
+                "updated_at = excluded.updated_at",
+                [(key, hw, ts) for key, (hw, ts) in self._pending_searches.items()],
+            )
+        self._pending_seen.clear()
+        self._pending_searches.clear()
+
+    def compact(self, max_age: float, keep: int):
+        """Drop seen IDs older than max_age or beyond the newest `keep` rows."""
+        self.flush()
+        with self.conn:
+            self.conn.execute("DELETE FROM seen WHERE seen_at < ?", (time.time() - max_age,))
+            self.conn.execute(
+                "DELETE FROM seen WHERE seen_at < ("
+                "  SELECT seen_at FROM seen ORDER BY seen_at DESC LIMIT 1 OFFSET ?"
+                ")",
+                (keep,),
+            )
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,70 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from filters import with_global_filters
+from utils import load_yaml, search_key
+from config import SEARCH_PARAMS, SEARCH_PARAMS_CHECK
+
+
+def load_search_params(path=SEARCH_PARAMS) -> List[Dict]:
+    config = load_yaml(path)
+    search_params_list = config.get("search_params")
+    if search_params_list is None:
+        raise KeyError(f"{path} must contain a 'search_params' key.")
+    return with_global_filters(search_params_list, config.get("filters"))
+
+
+def diff_searches(old: List[Dict], new: List[Dict]):
+    """Compare two search lists by canonical hash, returns (added, removed) hash sets."""
+    old_keys = {search_key(search_params) for search_params in old}
+    new_keys = {search_key(search_params) for search_params in new}
+    return new_keys - old_keys, old_keys - new_keys
+
+
+class SearchParamsWatcher:
+    """Notices edits to search_params.yaml by polling its modification time.
+
+    A change is only loaded once the file has stayed the same for one check,
+    so a file caught halfway through being saved is not picked up.
+    """
+
+    def __init__(self, path=SEARCH_PARAMS, interval=SEARCH_PARAMS_CHECK, logger=None):
+        self.path = path
+        self.interval = interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.loaded = self._signature()
+        self.pending = None
+        self.checked = time.time()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self, now=None) -> Optional[List[Dict]]:
+        """The new search list if the file changed since it was last loaded, else None."""
+        now = time.time() if now is None else now
+        if now - self.checked < self.interval:
+            return None
+        self.checked = now
+        signature = self._signature()
+        if signature is None or signature == self.loaded:
+            self.pending = None
+            return None
+        if signature != self.pending:
+            self.pending = signature  # load on the next check if it is still unchanged
+            return None
+        self.loaded, self.pending = signature, None
+        try:
+            search_params_list = load_search_params(self.path)
+        except Exception as e:
+            self.logger.error(f"Not reloading {self.path}: {e}")
+            return None
+        if not search_params_list:
+            self.logger.error(f"Not reloading {self.path}: no searches left")
+            return None
+        return search_params_list
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from mock_vinted import MockVinted, MockProxy
+
+
+@pytest.fixture
+def vinted():
+    mock = MockVinted(rate=0, latency=0, latency_jitter=0, seed=1)
+    mock.start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def proxy():
+    mock = MockProxy()
+    mock.start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def make_monitor(tmp_path, monkeypatch, vinted, proxy):
+    """Build VintedMonitors polling the stand-in through one proxy, notifying it too."""
+    from monitor import VintedMonitor
+    from notifier import NotificationDispatcher
+    from governor import RateGovernor
+
+    monkeypatch.chdir(tmp_path)
+    monitors = []
+
+    def make(searches, cls=VintedMonitor, **kwargs):
+        m = cls([proxy.url], searches, "token", "chat", base_url=vinted.base_url, **kwargs)
+        m.metrics_port = None
+        m.governor = RateGovernor(rate=100, max_rate=100, burst=100)
+        m.notifier = NotificationDispatcher(m.logger, "token", "chat", host="127.0.0.1",
+                                            port=int(vinted.base_url.rsplit(":", 1)[1]),
+                                            use_https=False, min_interval=0)
+        m.notifier.start()
+        monitors.append(m)
+        return m
+
+    yield make
+    for m in monitors:
+        m.close()
@@ -0,0 +1,68 @@
+"""The async engine against the local catalog stand-in."""
+import asyncio
+import threading
+
+from async_monitor import AsyncVintedMonitor
+
+SEARCH = {"catalog_ids[]": 101, "order": "newest_first", "currency": "EUR", "per_page": 20}
+
+
+def test_poll_writes_state_off_the_event_loop(make_monitor, vinted, monkeypatch):
+    m = make_monitor([SEARCH], cls=AsyncVintedMonitor)
+    old = vinted.add_items(SEARCH, 5)
+    flushed_on = []
+    flush = m.warmstate.flush
+
+    def record_flush():
+        flushed_on.append(threading.current_thread())
+        flush()
+
+    monkeypatch.setattr(m.warmstate, "flush", record_flush)
+
+    async def seed_and_poll():
+        m.limiter = asyncio.Semaphore(1)
+        m.sessions[0] = await m.refresh_session(0)
+        await m.in_state_thread(m.record_seed, 0, await m.fetch_async(0, m.seed_params(0)))
+        fresh = vinted.add_items(SEARCH, 3)
+        new_ids = await m.poll(0)
+        await m.sessions.pop(0)[1].aclose()
+        return fresh, new_ids
+
+    fresh, new_ids = asyncio.run(seed_and_poll())
+
+    assert m.high_water[0] == fresh[-1] and sorted(new_ids) == fresh
+    assert flushed_on and threading.current_thread() not in flushed_on
+    assert m.warmstate.search_state(m.queries[0].key)[0] == fresh[-1]
+    m.notifier.stop()
+    assert set(vinted.notified) == set(fresh)
+    assert not set(vinted.notified) & set(old)
+
+
+def test_reload_swaps_searches_on_the_state_thread(make_monitor, vinted, monkeypatch):
+    m = make_monitor([SEARCH], cls=AsyncVintedMonitor)
+    added_search = {**SEARCH, "catalog_ids[]": 102}
+    reloaded_on = []
+    reload = m.reload
+
+    def record_reload(search_params_list):
+        reloaded_on.append(threading.current_thread())
+        return reload(search_params_list)
+
+    monkeypatch.setattr(m, "reload", record_reload)
+
+    async def swap():
+        m.limiter = asyncio.Semaphore(1)
+        m.tasks = {0: asyncio.create_task(asyncio.sleep(3600))}
+        old = m.tasks[0]
+        added, removed = await m.reload_async([added_search])
+        tasks = dict(m.tasks)
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return added, removed, old, tasks
+
+    added, removed, old, tasks = asyncio.run(swap())
+
+    assert removed == {0} and old.cancelled()
+    assert set(tasks) == added == set(m.queries)
+    assert reloaded_on and threading.current_thread() not in reloaded_on
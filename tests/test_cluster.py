@@ -0,0 +1,61 @@
+"""Shard handover between workers through the coordinator."""
+import json
+import time
+
+from cluster import Coordinator
+from mock_vinted import query_params
+from planner import plan_queries
+from records import parse_catalog
+
+SEARCHES = [{"catalog_ids[]": 100 + i, "order": "newest_first", "currency": "EUR", "per_page": 20} for i in range(4)]
+
+
+def test_moved_query_takes_its_mark_along():
+    coordinator = Coordinator(["http://p:1"], SEARCHES)
+    coordinator.register("w0")
+    _, searches, marks = coordinator.shard("w0")
+    assert len(searches) == 4 and marks == {}
+    keys = [query.key for query in plan_queries(searches)]
+    coordinator.heartbeat("w0", [], [], [(key, 1000 + i) for i, key in enumerate(keys)])
+    coordinator.heartbeat("w0", [], [], [(keys[0], 900)])  # an older mark never moves it back
+
+    coordinator.register("w1")
+    coordinator.unregister("w0")
+
+    _, searches, marks = coordinator.shard("w1")
+    assert len(searches) == 4
+    assert {key: mark for key, (mark, _) in marks.items()} == {key: 1000 + i for i, key in enumerate(keys)}
+
+
+def test_adopted_mark_resumes_instead_of_seeding(make_monitor, vinted):
+    m = make_monitor(SEARCHES[:1])
+    old = vinted.add_items(SEARCHES[0], 30)
+    missed = vinted.add_items(SEARCHES[0], 3)  # listed while the shard was moving
+
+    m.adopt_marks({m.queries[0].key: (old[-1], time.time() - 5)})
+
+    assert m.load_warm_state() == []
+    assert m.high_water[0] == old[-1]
+    m.curr_proxy, m.session, m.api_client = m.refresh_clients()
+    assert sorted(m.poll(0)) == missed
+
+
+def test_price_drop_is_claimed_once_per_price():
+    coordinator = Coordinator(["http://p:1"], SEARCHES)
+    assert coordinator.claim_price_drops([(1, 10.0), (2, 5.0)]) == [1, 2]
+    assert coordinator.claim_price_drops([(1, 10.0)]) == []
+    assert coordinator.claim_price_drops([(1, 9.5)]) == [1]
+    assert coordinator.claim_price_drops([(1, 9.5), (2, 6.0)]) == []
+
+
+def test_shards_sharing_an_item_alert_its_drop_once(make_monitor, vinted):
+    coordinator = Coordinator(["http://p:1"], SEARCHES)
+    shards = [make_monitor(SEARCHES[:1], dedup=coordinator) for _ in range(2)]
+    (item_id,) = vinted.add_items(SEARCHES[0], 1)
+    (item,) = parse_catalog(json.dumps(vinted.catalog(query_params(SEARCHES[0]))).encode())
+
+    for m in shards:
+        m.notify_price_drops(0, [(item, float(item.price) + 5)])
+        m.notifier.stop()
+
+    assert vinted.requests["notify"] == 1 and item_id in vinted.notified
@@ -0,0 +1,24 @@
+"""The optional /metrics endpoint of a monitor."""
+import socket
+import urllib.request
+
+
+def test_port_in_use_leaves_monitor_running_without_endpoint(make_monitor):
+    taken = socket.socket()
+    taken.bind(("127.0.0.1", 0))
+    taken.listen()
+    try:
+        m = make_monitor([{"catalog_ids[]": 101, "order": "newest_first", "per_page": 20}])
+        m.metrics_port = taken.getsockname()[1]
+        m.start_metrics_server()
+        assert m.metrics_server is None
+    finally:
+        taken.close()
+
+
+def test_metrics_endpoint_serves_registry(make_monitor):
+    m = make_monitor([{"catalog_ids[]": 101, "order": "newest_first", "per_page": 20}])
+    m.metrics_port = 0
+    m.start_metrics_server()
+    body = urllib.request.urlopen(f"http://127.0.0.1:{m.metrics_server.port}/metrics").read().decode()
+    assert "vimo_seen_ids" in body
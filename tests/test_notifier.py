@@ -0,0 +1,75 @@
+"""NotificationDispatcher against the provider stand-in in bench/mock_vinted.py."""
+import json
+import logging
+import time
+
+import pytest
+
+from notifier import NotificationDispatcher
+
+TELEGRAM_429 = (429, json.dumps({"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                                 "parameters": {"retry_after": 1}}).encode(), [("Content-Type", "application/json")])
+PUSHOVER_429 = (429, b'{"status":0,"errors":["too many requests"]}', [("Retry-After", "1")])
+UNAVAILABLE = (503, b"Service Unavailable", [])
+
+
+def dispatcher(vinted, notify_type, **kwargs):
+    port = int(vinted.base_url.rsplit(":", 1)[1])
+    d = NotificationDispatcher(logging.getLogger("test.notifier"), "token", "chat", notify_type=notify_type,
+                               host="127.0.0.1", port=port, use_https=False, min_interval=0,
+                               retry_delay=0.1, **kwargs)
+    d.start()
+    return d
+
+
+def send(d, vinted, *item_ids):
+    for item_id in item_ids:
+        d.submit(f"Item\nURL: {vinted.base_url}/items/{item_id}")
+    d.stop()
+    return set(vinted.notified)
+
+
+@pytest.mark.parametrize("notify_type", ["telegram", "pushover"])
+def test_throttled_send_waits_retry_after(vinted, notify_type):
+    vinted.notify_replies.append(TELEGRAM_429 if notify_type == "telegram" else PUSHOVER_429)
+    d = dispatcher(vinted, notify_type)
+    start = time.time()
+
+    assert send(d, vinted, 1) == {1}
+    assert vinted.notified[1] - start >= 1
+    assert (d.sent, d.retried, d.failed) == (1, 1, 0)
+
+
+@pytest.mark.parametrize("notify_type", ["telegram", "pushover"])
+def test_server_error_is_retried(vinted, notify_type):
+    vinted.notify_replies += [UNAVAILABLE, UNAVAILABLE]
+    d = dispatcher(vinted, notify_type)
+
+    assert send(d, vinted, 1, 2) == {1, 2}
+    assert (d.sent, d.retried, d.failed) == (2, 2, 0)
+
+
+def test_retry_delay_doubles(vinted, caplog):
+    vinted.notify_replies += [UNAVAILABLE] * 3
+    d = dispatcher(vinted, "telegram")
+
+    with caplog.at_level(logging.WARNING, logger="test.notifier"):
+        assert send(d, vinted, 1) == {1}
+    waits = [record.args[-1] for record in caplog.records if "retry" in record.msg]
+    assert waits == pytest.approx([0.1, 0.2, 0.4])
+
+
+def test_retries_are_bounded(vinted):
+    vinted.notify_replies += [UNAVAILABLE] * 3
+    d = dispatcher(vinted, "telegram", retries=2)
+
+    assert send(d, vinted, 1, 2) == {2}
+    assert (d.sent, d.retried, d.failed) == (1, 2, 1)
+
+
+def test_client_error_is_not_retried(vinted):
+    vinted.notify_replies.append((400, b'{"ok":false,"error_code":400}', []))
+    d = dispatcher(vinted, "telegram")
+
+    assert send(d, vinted, 1, 2) == {2}
+    assert (d.sent, d.retried, d.failed) == (1, 0, 1)
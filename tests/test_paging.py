@@ -0,0 +1,96 @@
+"""Polling down to the high-water mark against the local catalog stand-in."""
+import pytest
+
+SEARCH = {"catalog_ids[]": 101, "order": "newest_first", "currency": "EUR", "per_page": 20}
+
+
+@pytest.fixture
+def monitor(make_monitor):
+    m = make_monitor([SEARCH])
+    m.curr_proxy, m.session, m.api_client = m.refresh_clients()
+    return m
+
+
+def notified(m, vinted):
+    m.notifier.stop()
+    return set(vinted.notified)
+
+
+def api_requests(vinted):
+    return vinted.requests["api"]
+
+
+def test_first_poll_without_mark_pages_through_burst(monitor, vinted):
+    monitor.seed(0)  # empty catalog, so the query gets no mark
+    assert 0 not in monitor.high_water
+    burst = vinted.add_items(SEARCH, 50)
+    before = api_requests(vinted)
+
+    new_ids = monitor.poll(0)
+
+    assert sorted(new_ids) == burst
+    assert api_requests(vinted) - before == 3
+    assert monitor.high_water[0] == burst[-1]
+    assert notified(monitor, vinted) == set(burst)
+
+
+def test_paging_continues_when_arrivals_shift_the_pages(monitor, vinted, monkeypatch):
+    monitor.seed(0)
+    burst = vinted.add_items(SEARCH, 50)
+    fetch_query = monitor.fetch_query
+    late = []
+
+    def fetch_with_arrival(q, page=1):
+        if page == 2:
+            late.extend(vinted.add_items(SEARCH, 1))  # pushes page 1's last item onto page 2
+        return fetch_query(q, page)
+
+    monkeypatch.setattr(monitor, "fetch_query", fetch_with_arrival)
+    assert sorted(monitor.poll(0)) == burst
+    assert monitor.poll(0) == late
+
+
+def test_burst_larger_than_page_after_mark(monitor, vinted):
+    old = vinted.add_items(SEARCH, 30)
+    monitor.seed(0)
+    assert monitor.high_water[0] == old[-1]
+    burst = vinted.add_items(SEARCH, 45)
+    before = api_requests(vinted)
+
+    new_ids = monitor.poll(0)
+
+    assert sorted(new_ids) == burst
+    assert api_requests(vinted) - before == 3
+    assert notified(monitor, vinted) == set(burst)
+
+
+def test_poll_stops_at_mark(monitor, vinted):
+    vinted.add_items(SEARCH, 30)
+    monitor.seed(0)
+    fresh = vinted.add_items(SEARCH, 5)
+    before = api_requests(vinted)
+
+    assert sorted(monitor.poll(0)) == fresh
+    assert api_requests(vinted) - before == 1
+    assert monitor.poll(0) == []
+    assert notified(monitor, vinted) == set(fresh)
+
+
+def test_bumped_listing_does_not_hide_new_items(monitor, vinted):
+    old = vinted.add_items(SEARCH, 30)
+    monitor.seed(0)
+    fresh = vinted.add_items(SEARCH, 3)
+    vinted.bump(SEARCH, old[0])
+
+    assert sorted(monitor.poll(0)) == fresh
+    assert notified(monitor, vinted) == set(fresh)
+
+
+def test_unseen_items_below_mark_are_not_new(monitor, vinted):
+    # a warm restart after the seen IDs aged out: the mark alone holds back old listings
+    old = vinted.add_items(SEARCH, 30)
+    monitor.high_water[0] = old[-1]
+    fresh = vinted.add_items(SEARCH, 2)
+
+    assert sorted(monitor.poll(0)) == fresh
+    assert notified(monitor, vinted) == set(fresh)
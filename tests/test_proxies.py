@@ -0,0 +1,87 @@
+"""Proxy scoring, rotation and health checks, probing through bench/mock_vinted.py stand-ins."""
+import time
+
+import pytest
+
+from mock_vinted import MockProxy
+from proxies import RotatingProxyManager, ProxyHealthChecker
+
+FAST, SLOW, FLAKY = "http://fast:1", "http://slow:1", "http://flaky:1"
+
+
+@pytest.fixture
+def manager():
+    m = RotatingProxyManager([FLAKY, SLOW, FAST])
+    for _ in range(10):
+        m.record(FAST, 0.1, True)
+        m.record(SLOW, 2.0, True)
+        m.record(FLAKY, 0.1, False)
+    return m
+
+
+def test_best_score_is_handed_out_first(manager):
+    assert manager.stats[FAST].score < manager.stats[SLOW].score < manager.stats[FLAKY].score
+    assert manager.get_next_proxy() == FAST
+
+
+def test_handout_penalty_rotates_within_score_order(manager):
+    handouts = [manager.get_next_proxy() for _ in range(6)]
+    assert handouts[:2] == [FAST, FAST]
+    assert SLOW in handouts and handouts.index(SLOW) > 0
+    assert FLAKY not in handouts
+
+
+def test_cooled_down_proxy_is_skipped_until_cooldown_ends(manager):
+    manager.mark_failed(FAST)
+    assert FAST not in {manager.get_next_proxy() for _ in range(5)}
+    manager.failed[FAST] = time.time() - 1
+    assert manager.get_next_proxy() == FAST
+    assert manager.get_next_proxy() != FAST  # back at the clock, not ahead by the handouts it missed
+
+
+def test_better_score_keeps_larger_share_over_time(manager):
+    for _ in range(5000):
+        manager.get_next_proxy()
+    recent = [manager.get_next_proxy() for _ in range(1000)]
+    assert recent.count(FAST) > 2 * recent.count(SLOW) > 0
+    assert recent.count(SLOW) > recent.count(FLAKY) > 0
+
+
+def test_added_proxy_joins_rotation_without_taking_it_over(manager):
+    for _ in range(5000):
+        manager.get_next_proxy()
+    new = "http://new:1"
+    manager.add([new])
+    handouts = [manager.get_next_proxy() for _ in range(300)]
+    assert 0 < handouts.count(new) < handouts.count(FAST)
+
+
+def test_exclude_skips_leased_proxies(manager):
+    assert manager.get_next_proxy(exclude={FAST}) == SLOW
+    assert manager.get_next_proxy(exclude={FAST, SLOW}) == FLAKY
+    with pytest.raises(RuntimeError):
+        manager.get_next_proxy(exclude={FAST, SLOW, FLAKY})
+
+
+def test_all_cooling_raises(manager):
+    for proxy in (FAST, SLOW, FLAKY):
+        manager.mark_failed(proxy)
+    with pytest.raises(RuntimeError):
+        manager.get_next_proxy()
+
+
+def test_check_all_marks_dead_proxy_failed(vinted, proxy):
+    dead = MockProxy(dead=True)
+    dead.start()
+    try:
+        manager = RotatingProxyManager([proxy.url, dead.url])
+        checker = ProxyHealthChecker(manager, url=f"{vinted.base_url}/health", timeout=2)
+
+        assert checker.check_all() == [True, False]
+        assert manager.failed[dead.url] > time.time()
+        assert proxy.url not in manager.failed
+        assert manager.stats[proxy.url].last_ok is not None
+        assert manager.get_next_proxy() == proxy.url
+        assert checker.check_all() == [True]  # cooling proxies are not probed again
+    finally:
+        dead.stop()
@@ -0,0 +1,19 @@
+"""Hot reload of the search list against the local catalog stand-in."""
+SEARCH = {"catalog_ids[]": 101, "order": "newest_first", "currency": "EUR", "per_page": 20}
+ADDED = {**SEARCH, "catalog_ids[]": 102}
+
+
+def test_added_query_is_seeded_by_reload(make_monitor, vinted):
+    m = make_monitor([SEARCH])
+    m.curr_proxy, m.session, m.api_client = m.refresh_clients()
+    existing = vinted.add_items(ADDED, 10)
+
+    added, removed = m.reload([SEARCH, ADDED])
+
+    (q,) = added
+    assert not removed and not m.unseeded
+    assert m.high_water[q] == existing[-1]
+    fresh = vinted.add_items(ADDED, 2)
+    assert sorted(m.poll(q)) == fresh
+    m.notifier.stop()
+    assert set(vinted.notified) == set(fresh)
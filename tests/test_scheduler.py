@@ -0,0 +1,47 @@
+"""Arrival-rate estimates and dispatch order of the poll scheduler."""
+import time
+
+from scheduler import PollScheduler
+
+T0 = time.time()
+
+
+def test_empty_poll_blends_into_prior():
+    s = PollScheduler([0], jitter=0, max_interval=900)
+    s.record(0, 0, T0)
+    s.record(0, 0, T0 + 20)
+    assert s.intervals[0] < 60
+
+
+def test_new_hour_starts_from_known_hours():
+    s = PollScheduler([0], jitter=0)
+    now = T0
+    for _ in range(30):
+        now += 20
+        s.record(0, 1, now)
+    busy = s.intervals[0]
+    now += 3600  # the next poll lands in an hour bucket without samples
+    s.record(0, 0, now)
+    assert s.intervals[0] < 2 * busy
+
+
+def test_spare_budget_goes_to_quiet_queries():
+    # three quiet queries on 3 requests per minute: each is still polled about once a minute
+    s = PollScheduler([0, 1, 2], jitter=0, budget_per_min=3, max_interval=900)
+    now = T0
+    polls = {0: [], 1: [], 2: []}
+    for _ in range(60):
+        q, wait = s.next(now)
+        now += wait
+        polls[q].append(now)
+        s.schedule(q, s.record(q, 0, now), now)
+    for times in polls.values():
+        assert max(b - a for a, b in zip(times, times[1:])) <= 60 + 1e-6
+
+
+def test_governor_pace_does_not_exceed_budget():
+    s = PollScheduler([0, 1], jitter=0, budget_per_min=3)
+    s.pace(2)  # the governor ramped up to 30 requests per minute
+    assert s.spacing == 20
+    s.pace(45)  # a throttled proxy slows below the budget
+    assert s.spacing == 45